@@ -0,0 +1,172 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import melbourne
+import output
+import scoreboards
+import scoring
+
+
+'''
+Renders many contests in one go, from a manifest listing them. The manifest is a JSON list with an object
+for each contest, e.g.
+    [{"csv": "2016.csv", "name": "Song Contest 2016", "flags": true, "accent": "#e91e63"}, ...]
+Each object needs "csv" (relative to the manifest) and "name", and can also set "main", "accent", "flags",
+"countries", "columns", "quality", "resolution", "format" and "output" (the directory its frames go in, also relative
+to the manifest). By default, frames go in a folder named after the contest in Output/, in the working directory
+like those of melbourne.py.
+
+All contests are rendered by the same process, or the same pool of worker processes, so the fonts, flags and
+countries only have to be loaded once. Once a contest is rendered, a record of its input and options is kept
+in its output directory, and the contest is skipped next time unless either of them has changed.
+'''
+BATCH_RECORD = '.batch-complete.json'
+
+
+# The options a contest is rendered with, filling in what the manifest leaves out from the command line
+def contest_options(item, manifest_dir, args):
+    csv_path = os.path.join(manifest_dir, item['csv'])
+    return {
+        'csv': csv_path,
+        'name': item['name'],
+        'main': item.get('main', '#2f292b'),
+        'accent': item.get('accent', '#009688'),
+        'flags': bool(item.get('flags', False)),
+        'countries': bool(item.get('countries', False)),
+        'columns': int(item.get('columns', 2)),
+        'quality': item.get('quality', args.quality),
+        'resolution': int(item.get('resolution', args.resolution)),
+        'format': item.get('format', args.format),
+        'compress_level': args.compress_level,
+        'output': os.path.join(manifest_dir, item['output']) if 'output' in item else
+                  os.path.join('Output', scoreboards.safe_file_name(item['name'])),
+    }
+
+
+# Digest of a contest's CSV file along with everything that changes how it is rendered
+def contest_digest(options):
+    digest = hashlib.sha1()
+    with open(options['csv'], 'rb') as file:
+        for block in iter(lambda: file.read(65536), b''):
+            digest.update(block)
+    digest.update(json.dumps(options, sort_keys=True).encode('utf8'))
+    return digest.hexdigest()
+
+
+def load_record(directory):
+    try:
+        with open(os.path.join(directory, BATCH_RECORD), encoding='utf8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_record(directory, record):
+    with output.atomic_path(os.path.join(directory, BATCH_RECORD)) as temp, open(temp, 'w', encoding='utf8') as file:
+        json.dump(record, file, ensure_ascii=False)
+
+
+'''
+Renders a single contest from the manifest, unless its output is already up to date (or force is set).
+Returns the contest's name, what happened to it, and how long that took.
+'''
+def render_contest(task):
+    options, force = task
+    start = time.perf_counter()
+    try:
+        digest = contest_digest(options)
+        directory = options['output']
+        record = load_record(directory)
+        if not force and record is not None and record['digest'] == digest and \
+                all(os.path.exists(os.path.join(directory, frame)) for frame in record['frames']):
+            return options['name'], 'skipped', time.perf_counter() - start
+
+        # The contest no longer counts as complete until it has been rendered again
+        if record is not None:
+            os.remove(os.path.join(directory, BATCH_RECORD))
+
+        contest_args = argparse.Namespace(contest_name=options['name'], flags=options['flags'], countries=options['countries'],
+                                          columns=options['columns'])
+        contest = melbourne.create_contest(contest_args, melbourne.load_data(options['csv']))
+        engine = scoring.ScoringEngine(contest)
+        colors = scoreboards.load_colors(main_color=options['main'], accent_color=options['accent'])
+        quality = scoreboards.Quality(options['quality'], options['resolution'])
+
+        frame_output = output.DirectoryOutput(directory, options['format'], options['compress_level'])
+        frame_output.open(contest, colors)
+        try:
+            melbourne.render_serial(contest, engine, colors, frame_output, None, quality, verbose=False)
+        finally:
+            frame_output.close()
+
+        frames = [frame_output.scoreboard_file_name(contest, current_voter_num) for current_voter_num in range(contest.num_voters)]
+        if contest.num_voters > 0:
+            frames.append(scoreboards.summary_file_name(contest, options['format']))
+
+        # Remove frames left over from an earlier render of the contest
+        if record is not None:
+            for frame in set(record['frames']) - set(frames):
+                path = os.path.join(directory, frame)
+                if os.path.exists(path):
+                    os.remove(path)
+        save_record(directory, {'digest': digest, 'frames': frames})
+        return options['name'], 'rendered {} frames'.format(len(frames)), time.perf_counter() - start
+    except Exception as error:
+        return options['name'], 'failed: {!r}'.format(error), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render every contest listed in a manifest")
+    parser.add_argument("manifest", help="JSON file listing the contests to render")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes, each rendering whole contests (Default: 1)")
+    parser.add_argument("-q", "--quality", choices=sorted(scoreboards.QUALITY_MODES), default="high", help="Render quality, unless a contest sets its own (Default: high)")
+    parser.add_argument("--resolution", type=int, default=2, help="Output resolution, unless a contest sets its own (Default: 2)")
+    parser.add_argument("--format", choices=output.FRAME_FORMATS, default="png", help="File format of the images, unless a contest sets its own (Default: png)")
+    parser.add_argument("--compress-level", type=int, choices=range(10), metavar="{0-9}", help="zlib compression level of PNG images (Default: Pillow's)")
+    parser.add_argument("--force", action="store_true", help="Render every contest, even those whose output is up to date")
+    args = parser.parse_args()
+    if args.resolution < 1:
+        parser.error("--resolution must be at least 1")
+
+    with open(args.manifest, encoding='utf8') as file:
+        manifest = json.load(file)
+    manifest_dir = os.path.dirname(os.path.abspath(args.manifest))
+    contests = [contest_options(item, manifest_dir, args) for item in manifest]
+    for options in contests:
+        if options['resolution'] < 1 or options['columns'] < 1:
+            parser.error("The resolution and columns of {} must be at least 1".format(options['name']))
+        if options['quality'] not in scoreboards.QUALITY_MODES:
+            parser.error("Unknown quality {!r} for {}, choose from {}".format(options['quality'], options['name'],
+                                                                              ', '.join(sorted(scoreboards.QUALITY_MODES))))
+        if options['format'] not in output.FRAME_FORMATS:
+            parser.error("Unknown format {!r} for {}, choose from {}".format(options['format'], options['name'],
+                                                                             ', '.join(output.FRAME_FORMATS)))
+
+    # Two contests writing into the same directory would overwrite each other's frames
+    directories = [os.path.abspath(options['output']) for options in contests]
+    if len(set(directories)) != len(directories):
+        parser.error("Every contest in the manifest needs its own output directory")
+
+    tasks = [(options, args.force) for options in contests]
+    failed = 0
+    if args.jobs > 1:
+        import multiprocessing
+        with multiprocessing.Pool(args.jobs) as pool:
+            results = pool.imap(render_contest, tasks)
+            for name, status, seconds in results:
+                print("{}: {} ({:.1f}s)".format(name, status, seconds))
+                failed += status.startswith('failed')
+    else:
+        for task in tasks:
+            name, status, seconds = render_contest(task)
+            print("{}: {} ({:.1f}s)".format(name, status, seconds))
+            failed += status.startswith('failed')
+
+    if failed:
+        sys.exit("{} of {} contests failed to render".format(failed, len(contests)))
+
+if __name__ == "__main__":
+    main()
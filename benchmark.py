@@ -0,0 +1,203 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import PIL
+import countries
+import flag_cache
+import melbourne
+import scoreboards
+import scoring
+
+
+# Points handed out by every voter, from first to last place
+POINTS = [12, 10, 8, 7, 6, 5, 4, 3, 2, 1]
+
+# Name fragments used when generating entries, mixing plain ASCII with accented and non-Latin text
+NAMES = ['Aurora', 'Björk', 'Zoë', 'Loïc', 'Sébastien', 'Ñandú', 'Dvořák', 'Łukasz', 'Ærø', 'Øystein',
+         'Ελένη', 'Дмитрий', 'Ayşe', 'Nguyễn', '美空', 'ひばり', '김민지', 'Sigur', 'Mø', 'Röyksopp']
+WORDS = ['Love', 'Night', 'Fire', 'Amour', 'Corazón', 'Sehnsucht', 'Ljubav', 'Αγάπη', 'Ночь', 'Sommar',
+         'Ciel', 'Tanz', '夜空', '사랑', 'Fjäril', 'Lumière', 'Dança', 'Světlo', 'Żywioł', 'Kærlighed']
+
+
+# Countries from Resources/countries.json which have a flag, so that contests can be rendered with --flags
+def load_countries():
+    names = []
+    for country in countries.get_registry().countries:
+        if os.path.exists('Resources/Flags/{}/{}.png'.format(country['category'], country['alpha-2'])):
+            names.append(country['name'])
+    return sorted(names)
+
+
+def random_name(rng, parts):
+    return ' '.join(rng.choice(parts) for _ in range(rng.randint(1, 3)))
+
+
+'''
+Writes a synthetic contest to a CSV file in the format expected by load_data and create_contest.
+Each voter gives out the usual 12 to 1 points to entries other than their own, and a share of the entries
+(dq_rate) is disqualified by one of the voters along the way.
+'''
+def generate_contest(path, num_entries, num_voters, dq_rate=0.02, unicode_names=True, seed=0):
+    rng = random.Random(seed)
+    country_names = load_countries()
+    names = NAMES if unicode_names else [name for name in NAMES if name.isascii()]
+    words = WORDS if unicode_names else [word for word in WORDS if word.isascii()]
+
+    voters = ['{} {}'.format(random_name(rng, names), voter_num + 1) for voter_num in range(num_voters)]
+    votes = [[''] * num_voters for _ in range(num_entries)]
+    for voter_num in range(num_voters):
+        candidates = [entry_num for entry_num in range(num_entries) if entry_num != voter_num]
+        for points, entry_num in zip(POINTS, rng.sample(candidates, min(len(candidates), len(POINTS)))):
+            votes[entry_num][voter_num] = str(points)
+    for entry_num in range(num_entries):
+        if num_voters > 0 and rng.random() < dq_rate:
+            votes[entry_num][rng.randrange(num_voters)] = 'DQ'
+
+    with open(path, 'w', encoding='utf8', newline='') as file:
+        writer = csv.writer(file, delimiter=';')
+        writer.writerow(['#', 'User', 'Country', 'Artist', 'Song', 'Total'] + voters)
+        for entry_num in range(num_entries):
+            writer.writerow([entry_num + 1, '{} {}'.format(random_name(rng, names), entry_num + 1), rng.choice(country_names),
+                             random_name(rng, names), random_name(rng, words), ''] + votes[entry_num])
+
+
+# Peak resident memory of this process, in MB
+def peak_rss():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    if sys.platform == 'darwin':
+        return usage / (1024.0 * 1024.0)
+    return usage / 1024.0
+
+
+class Timer:
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def run(self, stage, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.add(stage, time.perf_counter() - start)
+        return result
+
+
+# Renders the whole contest once, timing each stage of the pipeline separately
+def run_benchmark(csv_path, output_dir, display_flags, display_countries, quality):
+    timer = Timer()
+    colors = scoreboards.load_colors()
+    args = argparse.Namespace(contest_name='Benchmark Contest', flags=display_flags, countries=display_countries, columns=2)
+
+    contest = timer.run('load', lambda: melbourne.create_contest(args, melbourne.load_data(csv_path)))
+    engine = timer.run('scoring', scoring.ScoringEngine, contest)
+    standings = timer.run('scoring', lambda: [engine.standings(voter_num) for voter_num in range(contest.num_voters)])
+
+    layout = timer.run('layout', scoreboards.get_layout, contest, quality)
+    timer.run('layout', lambda: [layout.image_size(scoreboards.voter_header(contest, voter_num))
+                                 for voter_num in range(contest.num_voters)])
+
+    for current_voter_num in range(contest.num_voters):
+        img = timer.run('scoreboards', scoreboards.render_scoreboard, contest, standings[current_voter_num],
+                        current_voter_num, colors, quality=quality)
+        timer.run('save', img.save, os.path.join(output_dir, scoreboards.scoreboard_file_name(contest, current_voter_num)))
+    if contest.num_voters > 0:
+        img = timer.run('summary', scoreboards.render_summary, contest, standings[-1], colors, quality=quality)
+        timer.run('save', img.save, os.path.join(output_dir, scoreboards.summary_file_name(contest)))
+
+    frames = contest.num_voters + 1
+    total = sum(timer.stages.values())
+    return {
+        'stages': timer.stages,
+        'total': total,
+        'frames': frames,
+        'frames_per_second': frames / total if total else 0.0,
+        'peak_rss_mb': peak_rss(),
+    }
+
+
+# Prints how each stage compares with an earlier set of results
+def compare_results(results, baseline):
+    print("\n{:<12} {:>10} {:>10} {:>8}".format('Stage', 'Baseline', 'Current', 'Change'))
+    names = list(baseline['stages']) + [name for name in results['stages'] if name not in baseline['stages']]
+    rows = [(name, baseline['stages'].get(name), results['stages'].get(name)) for name in names]
+    rows.append(('total', baseline['total'], results['total']))
+    for name, before, after in rows:
+        if before is None or after is None:
+            print("{:<12} {:>10} {:>10}".format(name, '-' if before is None else '{:.3f}s'.format(before),
+                                                 '-' if after is None else '{:.3f}s'.format(after)))
+        else:
+            change = (after - before) / before * 100 if before else 0.0
+            print("{:<12} {:>9.3f}s {:>9.3f}s {:>+7.1f}%".format(name, before, after, change))
+    print("{:<12} {:>10.2f} {:>10.2f}".format('frames/sec', baseline['frames_per_second'], results['frames_per_second']))
+    print("{:<12} {:>8.1f}MB {:>8.1f}MB".format('peak RSS', baseline['peak_rss_mb'], results['peak_rss_mb']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scoreboard pipeline on a synthetic contest")
+    parser.add_argument("-e", "--entries", type=int, default=50, help="Number of entries in the contest (Default: 50)")
+    parser.add_argument("-v", "--voters", type=int, default=60, help="Number of voters in the contest (Default: 60)")
+    parser.add_argument("--dq-rate", type=float, default=0.02, help="Share of entries that get disqualified (Default: 0.02)")
+    parser.add_argument("--ascii", action="store_true", help="Only use ASCII names, instead of a mix of accented and non-Latin ones")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic contest (Default: 0)")
+    parser.add_argument("-f", "--flags", action="store_true", help="Display flags in the scoreboards")
+    parser.add_argument("-c", "--countries", action="store_true", help="Display artists' countries of origin in the scoreboards")
+    parser.add_argument("-q", "--quality", choices=sorted(scoreboards.QUALITY_MODES), default="high", help="Render quality (Default: high)")
+    parser.add_argument("--resolution", type=int, default=2, help="Output resolution, in pixels per scoreboard unit (Default: 2)")
+    parser.add_argument("--cold-cache", action="store_true", help="Start with an empty flag cache instead of the one on disk")
+    parser.add_argument("--csv", help="Also keep the generated contest at this location")
+    parser.add_argument("--label", default="", help="Label stored with the results, e.g. a version or commit")
+    parser.add_argument("-o", "--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare the results with an earlier JSON results file")
+    args = parser.parse_args()
+    if args.resolution < 1:
+        parser.error("--resolution must be at least 1")
+
+    work_dir = tempfile.mkdtemp(prefix='melbourne-benchmark-')
+    try:
+        csv_path = args.csv or os.path.join(work_dir, 'contest.csv')
+        generate_contest(csv_path, args.entries, args.voters, args.dq_rate, not args.ascii, args.seed)
+
+        if args.cold_cache:
+            flag_cache._flag_cache = flag_cache.FlagCache(os.path.join(work_dir, 'Flags'))
+        output_dir = os.path.join(work_dir, 'Output')
+        os.makedirs(output_dir)
+
+        results = run_benchmark(csv_path, output_dir, args.flags, args.countries,
+                                scoreboards.Quality(args.quality, args.resolution))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results['label'] = args.label
+    results['parameters'] = {
+        'entries': args.entries, 'voters': args.voters, 'dq_rate': args.dq_rate, 'unicode_names': not args.ascii,
+        'seed': args.seed, 'flags': args.flags, 'countries': args.countries, 'quality': args.quality,
+        'resolution': args.resolution, 'cold_cache': args.cold_cache,
+    }
+    results['environment'] = {'python': platform.python_version(), 'pillow': PIL.__version__, 'platform': platform.platform()}
+    results['timestamp'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+    print("{:<12} {:>10}".format('Stage', 'Time'))
+    for name, seconds in results['stages'].items():
+        print("{:<12} {:>9.3f}s".format(name, seconds))
+    print("{:<12} {:>9.3f}s".format('total', results['total']))
+    print("{} frames at {:.2f} frames/sec, peak RSS {:.1f}MB".format(results['frames'], results['frames_per_second'], results['peak_rss_mb']))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as file:
+            json.dump(results, file, indent=4)
+    if args.compare:
+        with open(args.compare, encoding='utf8') as file:
+            compare_results(results, json.load(file))
+
+if __name__ == "__main__":
+    main()
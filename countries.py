@@ -0,0 +1,117 @@
+import marshal
+import os
+import sys
+import unicodedata
+
+
+COUNTRIES_FILE = 'Resources/countries.json'
+
+# Changing how the registry is compiled means cached copies from older versions have to be thrown away
+REGISTRY_FORMAT = 1
+
+
+'''
+Strips accents, case and extra whitespace from a country name, so that e.g. "côte d'ivoire" and
+"Cote D'Ivoire" are treated as the same name.
+'''
+def normalize(name):
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+'''
+Every country that flags can be shown for, loaded from Resources/countries.json. Countries can be looked up
+by their full name, by their ISO code, or by either of those without accents and regardless of case.
+Lookups work like a dict's, raising a KeyError for unknown countries.
+'''
+class CountryRegistry:
+    def __init__(self, countries, index=None):
+        self.countries = countries
+        self.index = index
+        if index is None:
+            self.index = build_index(countries)
+
+    def __getitem__(self, name):
+        position = self.index.get(name)
+        if position is None:
+            position = self.index.get(normalize(name))
+            if position is None:
+                raise KeyError(name)
+        return self.countries[position]
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __len__(self):
+        return len(self.countries)
+
+
+# Maps each name a country can be looked up by to its position, preferring exact names over codes and aliases
+def build_index(countries):
+    index = {}
+    for position, country in enumerate(countries):
+        index.setdefault(country['name'], position)
+    for position, country in enumerate(countries):
+        index.setdefault(country['alpha-2'], position)
+    for position, country in enumerate(countries):
+        index.setdefault(normalize(country['name']), position)
+        index.setdefault(normalize(country['alpha-2']), position)
+    return index
+
+
+'''
+Loads the registry from its compiled copy in the cache if that is still up to date, or builds it from
+the JSON file otherwise. Like the flag tiles, the compiled copy is only used while its modification time
+matches that of the JSON file.
+'''
+def load_registry(source=COUNTRIES_FILE, cache_dir='Cache'):
+    source_mtime = os.stat(source).st_mtime_ns
+    compiled = os.path.join(cache_dir, 'countries.marshal')
+    try:
+        if os.stat(compiled).st_mtime_ns == source_mtime:
+            with open(compiled, 'rb') as file:
+                version, countries, index = marshal.load(file)
+            if version == (REGISTRY_FORMAT, sys.version_info[:2]):
+                return CountryRegistry(countries, index)
+    except (OSError, ValueError, EOFError, TypeError):
+        pass
+
+    # json is only needed when the registry has to be built again
+    import json
+    with open(source, encoding='utf8') as file:
+        registry = CountryRegistry(json.load(file))
+    save_registry(registry, compiled, source_mtime)
+    return registry
+
+
+# Save the compiled copy with the JSON file's modification time, so that it can be checked when it is loaded
+def save_registry(registry, compiled, source_mtime):
+    # output imports the modules which use this one, so it can only be imported once they are loaded
+    import output
+    try:
+        os.makedirs(os.path.dirname(compiled), exist_ok=True)
+        with output.atomic_path(compiled, source_mtime) as temp, open(temp, 'wb') as file:
+            marshal.dump(((REGISTRY_FORMAT, sys.version_info[:2]), registry.countries, registry.index), file)
+    except OSError:
+        # The compiled copy is only an optimization, so carry on without it
+        pass
+
+
+# Returns the registry, only loading it again if the JSON file has changed since it was loaded
+_registry = None
+_registry_mtime = None
+
+def get_registry():
+    global _registry, _registry_mtime
+    source_mtime = os.stat(COUNTRIES_FILE).st_mtime_ns
+    if _registry is None or source_mtime != _registry_mtime:
+        _registry = load_registry()
+        _registry_mtime = source_mtime
+    return _registry
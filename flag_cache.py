@@ -0,0 +1,78 @@
+import hashlib
+import os
+
+
+'''
+Caches flags that have been scaled and bordered for the scoreboards, keyed by country, scale and border color.
+Each flag is decoded and resized at most once per run, and the finished tiles are also kept on disk
+so that later runs can paste them straight away. A tile on disk is only reused while its modification
+time matches that of the source flag.
+'''
+class FlagCache:
+    def __init__(self, cache_dir='Cache/Flags'):
+        self.cache_dir = cache_dir
+        self.flags = {}
+
+    def get(self, country, scale, border_color):
+        key = (country['category'], country['alpha-2'], scale, tuple(border_color))
+        flag = self.flags.get(key)
+        if flag is None:
+            flag = self.load(key)
+            self.flags[key] = flag
+        return flag
+
+    def load(self, key):
+        from PIL import Image
+        category, country_iso, scale, border_color = key
+        source = 'Resources/Flags/{}/{}.png'.format(category, country_iso)
+        source_mtime = os.stat(source).st_mtime_ns
+
+        tile = os.path.join(self.cache_dir, tile_name(key))
+        try:
+            if os.stat(tile).st_mtime_ns == source_mtime:
+                flag = Image.open(tile)
+                flag.load()
+                return flag
+        except OSError:
+            pass
+
+        flag = scale_flag(Image.open(source, 'r'), scale, border_color)
+        self.save(flag, tile, source_mtime)
+        return flag
+
+    def save(self, flag, tile, source_mtime):
+        # output imports the modules which use this one, so it can only be imported once they are loaded
+        import output
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with output.atomic_path(tile, source_mtime) as temp:
+                flag.save(temp, format='PNG')
+        except OSError:
+            # The disk cache is only an optimization, so carry on without it
+            pass
+
+
+# Resize a flag so that its longest side is 20 units long, and add a 1 pixel border around it
+def scale_flag(flag, scale, border_color):
+    from PIL import Image, ImageOps
+    flag_width, flag_height = flag.size
+
+    if flag_width < flag_height:
+        flag = flag.resize((int((float(flag_width) / flag_height) * 20 * scale), 20 * scale), Image.ANTIALIAS)
+    elif flag_width == flag_height:
+        flag = flag.resize((20 * scale, 20 * scale), Image.ANTIALIAS)
+    else:
+        flag = flag.resize((20 * scale, int((float(flag_height) / flag_width) * 20 * scale)), Image.ANTIALIAS)
+    return ImageOps.expand(flag, border=1, fill=border_color)
+
+
+def tile_name(key):
+    category, country_iso, scale, border_color = key
+    digest = hashlib.sha1('{}/{}'.format(category, country_iso).encode('utf8')).hexdigest()[:16]
+    return '{}-{}x-{:02x}{:02x}{:02x}.png'.format(digest, scale, *border_color[:3])
+
+
+_flag_cache = FlagCache()
+
+def get_flag(country, scale, border_color):
+    return _flag_cache.get(country, scale, border_color)
@@ -1,19 +1,33 @@
+from array import array
 import argparse
 import csv
+import hashlib
+import itertools
+import json
+import os
+import time
+import output
+import profiling
 import scoreboards
+import scoring
 
 class Contest:
-    def __init__(self, name, data, voters, display_flags, display_countries):
+    def __init__(self, name, data, voters, display_flags, display_countries, columns=2):
         self.name = name
         self.data = data
         self.voters = voters
         self.display_flags = display_flags
         self.display_countries = display_countries
+        # Number of columns the entries are split into on the scoreboards
+        self.columns = columns
 
         self.num_voters = len(self.voters)
         self.num_entries = len(self.data)
 
 class Entry:
+    __slots__ = ('user', 'country', 'artist', 'song', 'voters', 'total_pts', 'display_pts', 'num_voters', 'disqualified')
+
+    # voters holds the points given by each voter, packed into an array with scoring.BLANK and scoring.DQ for other cells
     def __init__(self, user, country, artist, song, voters):
         self.user = user
         self.country = country
@@ -31,55 +45,64 @@ class Entry:
         self.disqualified = False
 
 
-# Load the CSV data from file
+'''
+Load the CSV data from file, one row at a time. The delimiter is identified from the first line,
+which is then read again from memory, so the file is only opened and read once.
+'''
 def load_data(file_location):
-    data = []
-
-    # Identify the delimiter used in the CSV file
     with open(file_location, encoding='utf8') as file:
-        sniffer = csv.Sniffer()
-        dialect = sniffer.sniff(file.readline())
-        delimiter = dialect.delimiter
+        with profiling.stage('csv sniff'):
+            first_line = file.readline()
+            sniffer = csv.Sniffer()
+            dialect = sniffer.sniff(first_line)
 
-    with open(file_location, encoding='utf8') as file:
-        reader = csv.reader(file, delimiter=delimiter)
+        reader = csv.reader(itertools.chain([first_line], file), delimiter=dialect.delimiter)
         for row in reader:
             # Ignore the first column when importing CSV data
-            data.append(row[1:])
-
-    return data
+            yield row[1:]
 
 
 # Format the raw CSV data and create an instance of the Contest class
 def create_contest(args, data):
     formatted_data = []
+    rows = iter(data)
 
-    # We want to format the table rows into an easily searchable dictionary
-    for row in data[1:]:
-        formatted_data.append(Entry(row[0].strip(), row[1].strip(), row[2].strip(), row[3].strip(), row[5:]))
+    voters = next(rows)[5:]
+    for row in rows:
+        try:
+            votes = array('i', (scoring.parse_vote(cell) for cell in row[5:5+len(voters)]))
+        except ValueError as error:
+            raise ValueError("Votes for {} - {}: {}".format(row[2].strip(), row[3].strip(), error))
+        # Rows that stop early haven't been voted on by the remaining voters
+        votes.extend([scoring.BLANK] * (len(voters) - len(votes)))
+        formatted_data.append(Entry(row[0].strip(), row[1].strip(), row[2].strip(), row[3].strip(), votes))
 
-    voters = data[0][5:]
-    return Contest(args.contest_name, formatted_data, voters, args.flags, args.countries)
+    return Contest(args.contest_name, formatted_data, voters, args.flags, args.countries, args.columns)
 
 
 # Add current voter's votes and return the sorted data
 def process_voter(contest, current_voter_num):
     for row in contest.data:
-        if row.voters[current_voter_num].upper() == 'DQ':
+        points = row.voters[current_voter_num]
+        if points == scoring.DQ:
             row.disqualified = True
             row.total_pts = -1
-        try:
-            points = int(row.voters[current_voter_num])
-            # Don't add to total_pts if the entry is disqualified
-            if not row.disqualified:
-                row.total_pts += points
-
-            row.display_pts += points
-            row.num_voters += 1
-        except ValueError:
             continue
-    # Sort by total_pts then display_pts, number of voters and finally artist name
-    return sorted(contest.data, key=lambda k: (-k.total_pts, -k.display_pts, -k.num_voters, k.artist.lower()))
+        if points == scoring.BLANK:
+            continue
+
+        # Don't add to total_pts if the entry is disqualified
+        if not row.disqualified:
+            row.total_pts += points
+
+        row.display_pts += points
+        row.num_voters += 1
+    return sort_entries(contest.data)
+
+
+# Sort by total_pts then display_pts, number of voters and finally artist name
+def sort_entries(data):
+    return sorted(data, key=lambda k: (-k.total_pts, -k.display_pts, -k.num_voters, k.artist.lower()))
 
 
 def print_leaders(sorted_data):
@@ -92,6 +115,301 @@ def print_leaders(sorted_data):
         place += 1
 
 
+'''
+Worker process state used when rendering in parallel. The contest and colors are sent once to
+each worker when the pool starts, so that each task only has to carry a standings snapshot.
+Frames are saved by the workers themselves, unless the output needs them in order in the main process.
+'''
+_worker_contest = None
+_worker_colors = None
+_worker_output = None
+_worker_image_width = None
+_worker_quality = None
+
+def init_worker(contest, colors, frame_output, image_width, quality):
+    global _worker_contest, _worker_colors, _worker_output, _worker_image_width, _worker_quality
+    _worker_contest = contest
+    _worker_colors = colors
+    # Each frame has to be on disk by the time render_frame returns, as the pool is shut down as soon as the last one does.
+    # Forked workers get the output without it being pickled, so background writers have to be turned off here.
+    if frame_output is not None:
+        frame_output.writers = 0
+    _worker_output = frame_output
+    _worker_image_width = image_width
+    _worker_quality = quality
+
+
+def render_frame(task):
+    current_voter_num, sorted_data = task
+    if current_voter_num is None:
+        img = scoreboards.render_summary(_worker_contest, sorted_data, _worker_colors, _worker_image_width, _worker_quality)
+        if _worker_output is not None:
+            _worker_output.write_summary(_worker_contest, img)
+    else:
+        img = scoreboards.render_scoreboard(_worker_contest, sorted_data, current_voter_num, _worker_colors,
+                                            _worker_image_width, _worker_quality)
+        if _worker_output is not None:
+            _worker_output.write_scoreboard(_worker_contest, current_voter_num, img)
+
+    if _worker_output is not None:
+        return current_voter_num, None
+    return current_voter_num, img
+
+
+# Render each voter's scoreboard in turn, followed by the summary
+def render_serial(contest, engine, colors, frame_output, image_width, quality, verbose=True, strip_rows=None):
+    for current_voter_num in range(contest.num_voters):
+        with profiling.stage('frame', voter=current_voter_num + 1):
+            with profiling.stage('scoring'):
+                sorted_data = engine.standings(current_voter_num)
+
+            if verbose:
+                print("\nGenerating Scoreboard {}/{} (Voter: {})".format(current_voter_num+1, contest.num_voters, contest.voters[current_voter_num]))
+                print("       ---- Top 5 ----")
+                print_leaders(sorted_data)
+            if strip_rows:
+                strips = scoreboards.scoreboard_strips(contest, sorted_data, current_voter_num, colors, image_width, quality, strip_rows)
+                frame_output.write_strips(frame_output.scoreboard_file_name(contest, current_voter_num), *strips)
+            else:
+                img = scoreboards.render_scoreboard(contest, sorted_data, current_voter_num, colors, image_width, quality)
+                frame_output.write_scoreboard(contest, current_voter_num, img)
+    if contest.num_voters > 0:
+        with profiling.stage('frame'):
+            if strip_rows:
+                strips = scoreboards.summary_strips(contest, sorted_data, colors, image_width, quality, strip_rows)
+                frame_output.write_strips(scoreboards.summary_file_name(contest, frame_output.file_format), *strips)
+            else:
+                img = scoreboards.render_summary(contest, sorted_data, colors, image_width, quality)
+                frame_output.write_summary(contest, img)
+
+
+# Like Pool.imap, except that at most window tasks are handed out whose results haven't been taken yet
+def bounded_imap(pool, function, tasks, window):
+    from collections import deque
+    pending = deque()
+    for task in tasks:
+        if len(pending) >= window:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(function, (task,)))
+    while pending:
+        yield pending.popleft().get()
+
+
+# Compute every voter's standings up front, then spread the rendering of each frame across a process pool
+def render_parallel(contest, engine, colors, frame_output, image_width, quality, jobs):
+    import multiprocessing
+    tasks = []
+    for current_voter_num in range(contest.num_voters):
+        sorted_data = engine.standings(current_voter_num)
+
+        print("\nStandings {}/{} (Voter: {})".format(current_voter_num+1, contest.num_voters, contest.voters[current_voter_num]))
+        print("       ---- Top 5 ----")
+        print_leaders(sorted_data)
+        tasks.append((current_voter_num, sorted_data))
+    if contest.num_voters > 0:
+        tasks.append((None, tasks[-1][1]))
+
+    worker_output = None if frame_output.streaming else frame_output
+
+    with multiprocessing.Pool(jobs, initializer=init_worker, initargs=(contest, colors, worker_output, image_width, quality)) as pool:
+        if worker_output is None:
+            # Frames come back to be written here, which can be slower than drawing them, so only a few are handed out at a time
+            results = bounded_imap(pool, render_frame, tasks, jobs * 2)
+        else:
+            # Hand out contiguous runs of frames so each worker's chunks are roughly the same size
+            results = pool.imap(render_frame, tasks, max(1, len(tasks) // (jobs * 4)))
+        for current_voter_num, img in results:
+            if current_voter_num is None:
+                if img is not None:
+                    frame_output.write_summary(contest, img)
+                print("\nGenerated Summary")
+            else:
+                if img is not None:
+                    frame_output.write_scoreboard(contest, current_voter_num, img)
+                print("\nGenerated Scoreboard {}/{} (Voter: {})".format(current_voter_num+1, contest.num_voters,
+                        contest.voters[current_voter_num]))
+
+
+'''
+Watch mode, for live shows where the CSV file grows one voter at a time. The file is polled for changes and only
+the voters that are new (or whose votes were edited) are applied and rendered, along with an updated summary.
+The cumulative standings and the list of frames already rendered are checkpointed in the output directory,
+so that restarting the watcher carries on from where it left off.
+Frames that are already on disk aren't drawn again when voters are added, so they keep the voter count in their
+header ("(k/N)") that they were rendered with, and differ from those of a full render of the final file.
+'''
+WATCH_CHECKPOINT = '.watch-checkpoint.json'
+
+def entry_key(entry):
+    return [entry.user, entry.country, entry.artist, entry.song]
+
+
+# Digest of the votes cast by the first num_voters voters, used to tell whether they have changed since the checkpoint
+def votes_digest(contest, num_voters):
+    digest = hashlib.sha1()
+    for entry in contest.data:
+        digest.update(entry.voters[:num_voters].tobytes())
+    return digest.hexdigest()
+
+
+def save_checkpoint(path, contest, options, frames):
+    checkpoint = {
+        'options': options,
+        'voters': contest.voters[:len(frames)],
+        'digest': votes_digest(contest, len(frames)),
+        'entries': [entry_key(entry) + [entry.total_pts, entry.display_pts, entry.num_voters, entry.disqualified]
+                    for entry in contest.data],
+        'frames': frames,
+    }
+    with output.atomic_path(path) as temp, open(temp, 'w', encoding='utf8') as file:
+        json.dump(checkpoint, file, ensure_ascii=False)
+
+
+'''
+Restores the entries' standings from the checkpoint if it matches the contest. Returns the frames that are
+already rendered, along with every frame the checkpoint lists so that ones which are out of date can be removed.
+'''
+def restore_checkpoint(path, contest, options, directory):
+    try:
+        with open(path, encoding='utf8') as file:
+            checkpoint = json.load(file)
+    except (OSError, ValueError):
+        return [], []
+
+    frames = checkpoint['frames']
+    num_voters = len(frames)
+    if checkpoint['options'] != options or num_voters > contest.num_voters or \
+            checkpoint['voters'] != contest.voters[:num_voters] or \
+            [row[:4] for row in checkpoint['entries']] != [entry_key(entry) for entry in contest.data] or \
+            checkpoint['digest'] != votes_digest(contest, num_voters) or \
+            not all(os.path.exists(os.path.join(directory, frame)) for frame in frames):
+        return [], frames
+
+    for entry, row in zip(contest.data, checkpoint['entries']):
+        entry.total_pts, entry.display_pts, entry.num_voters, entry.disqualified = row[4:]
+    return frames, frames
+
+
+'''
+Brings the contest up to date with the latest contents of the CSV file, and returns the first voter that has to be rendered.
+As long as the entries are the same, the contest itself is kept so that its layout and previous frame stay warm.
+'''
+def update_contest(contest, latest, applied):
+    if [entry_key(entry) for entry in contest.data] != [entry_key(entry) for entry in latest.data]:
+        return latest, 0
+
+    first_changed = min(applied, latest.num_voters)
+    for current_voter_num in range(first_changed):
+        if contest.voters[current_voter_num] != latest.voters[current_voter_num]:
+            first_changed = current_voter_num
+            break
+    for entry, latest_entry in zip(contest.data, latest.data):
+        if entry.voters[:first_changed] != latest_entry.voters[:first_changed]:
+            first_changed = next(current_voter_num for current_voter_num in range(first_changed)
+                                 if entry.voters[current_voter_num] != latest_entry.voters[current_voter_num])
+
+    contest.voters = latest.voters
+    contest.num_voters = latest.num_voters
+    for entry, latest_entry in zip(contest.data, latest.data):
+        entry.voters = latest_entry.voters
+
+    # Earlier votes were edited, so replay the voters before them to get back the standings at that point
+    if first_changed < applied:
+        for entry in contest.data:
+            entry.total_pts = 0
+            entry.display_pts = 0
+            entry.num_voters = 0
+            entry.disqualified = False
+        for current_voter_num in range(first_changed):
+            process_voter(contest, current_voter_num)
+    return contest, first_changed
+
+
+def render_new_voters(contest, first_changed, frames, colors, quality, frame_output):
+    frames = frames[:first_changed]
+    sorted_data = sort_entries(contest.data)
+    for current_voter_num in range(first_changed, contest.num_voters):
+        with profiling.stage('frame', voter=current_voter_num + 1):
+            with profiling.stage('scoring'):
+                sorted_data = process_voter(contest, current_voter_num)
+
+            print("\nGenerating Scoreboard {}/{} (Voter: {})".format(current_voter_num+1, contest.num_voters, contest.voters[current_voter_num]))
+            print("       ---- Top 5 ----")
+            print_leaders(sorted_data)
+            img = scoreboards.render_scoreboard(contest, sorted_data, current_voter_num, colors, quality=quality)
+            frame_output.write_scoreboard(contest, current_voter_num, img)
+            frames.append(frame_output.scoreboard_file_name(contest, current_voter_num))
+
+    if contest.num_voters > 0:
+        with profiling.stage('frame'):
+            img = scoreboards.render_summary(contest, sorted_data, colors, quality=quality)
+            frame_output.write_summary(contest, img)
+
+    # The checkpoint may only list frames once they are on disk
+    frame_output.flush()
+    return frames
+
+
+def watch(args, colors, quality):
+    frame_output = output.create_output(args)
+    checkpoint_path = os.path.join(frame_output.directory, WATCH_CHECKPOINT)
+    options = {'contest_name': args.contest_name, 'flags': args.flags, 'countries': args.countries,
+               'main_color': args.main_color, 'accent_color': args.accent_color,
+               'quality': args.quality, 'resolution': args.resolution, 'format': args.format, 'columns': args.columns}
+
+    contest = None
+    frames = []
+    previous_frames = []
+    last_seen = None
+    last_failed = ()
+    print("Watching {} for new voters (Press Ctrl+C to stop)".format(args.file_location))
+    try:
+        while True:
+            version = None
+            try:
+                stat = os.stat(args.file_location)
+                version = (stat.st_mtime_ns, stat.st_size)
+                latest = None
+                if version != last_seen:
+                    latest = create_contest(args, load_data(args.file_location))
+            except (OSError, csv.Error, StopIteration, ValueError, IndexError) as error:
+                # The file may be missing, empty or only partly saved (e.g. while an editor writes it again),
+                # so keep polling and read it again next time
+                if version != last_failed:
+                    print("Could not read {}, trying again: {!r}".format(args.file_location, error))
+                    last_failed = version
+                time.sleep(args.interval)
+                continue
+
+            if latest is not None:
+                last_seen = version
+                last_failed = ()
+
+                if contest is None:
+                    contest = latest
+                    frame_output.open(contest, colors)
+                    frames, previous_frames = restore_checkpoint(checkpoint_path, contest, options, frame_output.directory)
+                    first_changed = len(frames)
+                else:
+                    contest, first_changed = update_contest(contest, latest, len(frames))
+                    previous_frames = frames
+
+                if first_changed < contest.num_voters or len(previous_frames) != contest.num_voters:
+                    frames = render_new_voters(contest, first_changed, frames, colors, quality, frame_output)
+                    save_checkpoint(checkpoint_path, contest, options, frames)
+
+                    # Remove frames of voters that are no longer in the file
+                    for frame in set(previous_frames) - set(frames):
+                        path = os.path.join(frame_output.directory, frame)
+                        if os.path.exists(path):
+                            os.remove(path)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\nStopped watching {}".format(args.file_location))
+    finally:
+        frame_output.close()
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("file_location", help="Input CSV file location")
@@ -100,10 +418,72 @@ def main():
     parser.add_argument("-c", "--countries", action="store_true", help="Display artists' countries of origin in the scoreboards?")
     parser.add_argument("--main", dest="main_color", help="Main color used in the scoreboards (Default: #2f292b")
     parser.add_argument("--accent", dest="accent_color", help="Accent color used in the scoreboards (Default: #009688")
+    parser.add_argument("--columns", type=int, default=2, help="Number of columns the entries are split into (Default: 2)")
+    parser.add_argument("--strip-rows", type=int, metavar="ROWS",
+                        help="Draw and write each image this many rows of entries at a time, to bound memory use for large contests")
+    parser.add_argument("-l", "--leaders", action="store_true", help="Only print the top 5 after the last voter, without rendering any scoreboards")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes used to render the scoreboards (Default: 1)")
+    parser.add_argument("-q", "--quality", choices=sorted(scoreboards.QUALITY_MODES), default="high",
+                        help="Render quality: draft is drawn at the output resolution, standard and high are drawn larger and resized down (Default: high)")
+    parser.add_argument("--resolution", type=int, default=2, help="Output resolution, in pixels per scoreboard unit (Default: 2)")
+    parser.add_argument("--animate", help="Write the scoreboards into a single animated PNG (or GIF, for a .gif file) instead of separate images")
+    parser.add_argument("--pipe", help="Stream the scoreboards as raw RGB frames to this command's standard input, "
+                                       "e.g. \"ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height} -r {rate} -i - out.mp4\"")
+    parser.add_argument("--format", choices=output.FRAME_FORMATS, default="png",
+                        help="File format of the separate images: png, lossless webp, or raw pixel data (Default: png)")
+    parser.add_argument("--compress-level", type=int, choices=range(10), metavar="{0-9}",
+                        help="zlib compression level of PNG images, where 0 is fastest and 9 is smallest (Default: Pillow's)")
+    parser.add_argument("--writers", type=int, default=1,
+                        help="Number of background threads writing images while the next ones are drawn, 0 to write in turn (Default: 1)")
+    parser.add_argument("--max-pending", type=int, default=2,
+                        help="Most images kept in memory waiting to be written before drawing waits for a writer (Default: 2)")
+    parser.add_argument("-w", "--watch", action="store_true", help="Keep watching the CSV file, and only render voters as they are added")
+    parser.add_argument("--interval", type=float, default=1.0, help="How often the CSV file is checked for changes in watch mode, in seconds (Default: 1)")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="Serve the scoreboards over HTTP on this port instead of saving them, "
+                                                                  "at /frame/{voter} and /summary")
+    parser.add_argument("--host", default="127.0.0.1", help="Address the server listens on (Default: 127.0.0.1)")
+    parser.add_argument("--cache-size", type=int, default=256, help="Memory used to cache served frames, in MB (Default: 256)")
+    parser.add_argument("--frame-duration", type=int, default=1000, help="How long each scoreboard is shown in an animation, in ms (Default: 1000)")
+    parser.add_argument("--summary-duration", type=int, default=5000, help="How long the summary is shown in an animation, in ms (Default: 5000)")
+    parser.add_argument("--profile", action="store_true", help="Time each stage and frame of the rendering, and print a summary at the end")
+    parser.add_argument("--trace", help="Also write the profile to this file in Chrome's trace format (implies --profile)")
     args = parser.parse_args()
+    if args.watch and (args.animate is not None or args.pipe is not None or args.jobs > 1):
+        parser.error("--watch can't be combined with --animate, --pipe or --jobs")
+    if args.serve is not None and (args.watch or args.animate is not None or args.pipe is not None or args.jobs > 1):
+        parser.error("--serve can't be combined with --watch, --animate, --pipe or --jobs")
+    if args.strip_rows is not None and (args.watch or args.serve is not None or args.animate is not None or
+                                        args.pipe is not None or args.jobs > 1 or args.format == 'webp' or args.strip_rows < 1):
+        parser.error("--strip-rows must be at least 1, and only works when writing separate PNG or raw images without --jobs, --watch or --serve")
+    if args.columns < 1:
+        parser.error("--columns must be at least 1")
+    if args.resolution < 1:
+        parser.error("--resolution must be at least 1")
+    if (args.profile or args.trace is not None) and args.jobs > 1:
+        parser.error("--profile can't be combined with --jobs, as frames are rendered in other processes")
 
-    data = load_data(args.file_location)
-    contest = create_contest(args, data)
+    profiler = None
+    if args.profile or args.trace is not None:
+        profiler = profiling.enable()
+    try:
+        run(args)
+    finally:
+        if profiler is not None:
+            profiler.print_summary()
+            if args.trace is not None:
+                profiler.write_trace(args.trace)
+
+
+def run(args):
+    # Quick check of who's leading, which doesn't need any of the rendering libraries
+    if args.leaders:
+        contest = create_contest(args, load_data(args.file_location))
+        sorted_data = sort_entries(contest.data)
+        for current_voter_num in range(contest.num_voters):
+            sorted_data = process_voter(contest, current_voter_num)
+        print("Standings after {}/{} voters".format(contest.num_voters, contest.num_voters))
+        print_leaders(sorted_data)
+        return
 
     if args.main_color != None and args.accent_color != None:
         colors = scoreboards.load_colors(main_color=args.main_color, accent_color=args.accent_color)
@@ -114,14 +494,38 @@ def main():
     else:
         colors = scoreboards.load_colors()
 
-    for current_voter_num in range(contest.num_voters):
-        sorted_data = process_voter(contest, current_voter_num)
+    quality = scoreboards.Quality(args.quality, args.resolution)
+    if args.watch:
+        watch(args, colors, quality)
+        return
+    if args.serve is not None:
+        import server
+        options = {'contest_name': args.contest_name, 'flags': args.flags, 'countries': args.countries, 'columns': args.columns}
+        service = server.RenderService(lambda: create_contest(args, load_data(args.file_location)), args.file_location,
+                                       options, colors, quality, server.FrameCache(args.cache_size * 1024 * 1024))
+        server.serve(service, args.host, args.serve)
+        return
 
-        print("\nGenerating Scoreboard {}/{} (Voter: {})".format(current_voter_num+1, contest.num_voters, contest.voters[current_voter_num]))
-        print("       ---- Top 5 ----")
-        print_leaders(sorted_data)
-        scoreboards.generate_scoreboard(contest, sorted_data, current_voter_num, colors)
-    scoreboards.generate_summary(contest, sorted_data, colors)
+    with profiling.stage('csv parse'):
+        data = load_data(args.file_location)
+        contest = create_contest(args, data)
+    with profiling.stage('scoring'):
+        engine = scoring.ScoringEngine(contest)
+
+    # Animations and encoders need every frame to be the same size, so make them all as wide as the widest one
+    frame_output = output.create_output(args)
+    image_width = None
+    if frame_output.streaming and contest.num_voters > 0:
+        image_width = scoreboards.max_image_width(contest, quality)
+
+    frame_output.open(contest, colors)
+    try:
+        if args.jobs > 1:
+            render_parallel(contest, engine, colors, frame_output, image_width, quality, args.jobs)
+        else:
+            render_serial(contest, engine, colors, frame_output, image_width, quality, strip_rows=args.strip_rows)
+    finally:
+        frame_output.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
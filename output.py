@@ -0,0 +1,359 @@
+import contextlib
+import io
+import os
+import shlex
+import struct
+import subprocess
+import threading
+import zlib
+import profiling
+import scoreboards
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+'''
+The outputs below all take the finished frames in order: one scoreboard per voter, followed by the summary.
+Each one is told up front how many frames there will be and how long each one should be shown for.
+'''
+
+# Formats that frames can be saved in as separate files, by file extension
+FRAME_FORMATS = ['png', 'webp', 'raw']
+
+'''
+Writes each frame to its own file, the way the scoreboards have always been saved. Encoding a frame takes about
+as long as drawing one, so frames are handed to background writer threads while the next one is drawn.
+At most max_pending frames are waiting to be written at any time, after which the render loop waits for a writer.
+With no writers, each frame is written before the next one is drawn.
+'''
+class DirectoryOutput:
+    # Frames can be written from any process, so parallel workers save them directly
+    streaming = False
+
+    def __init__(self, directory='Output', file_format='png', compress_level=None, writers=1, max_pending=2):
+        self.directory = directory
+        self.file_format = file_format
+        self.compress_level = compress_level
+        self.writers = writers
+        self.max_pending = max(1, max_pending)
+        self.executor = None
+        self.slots = None
+        self.pending = []
+
+    # Copies sent to worker processes don't take the writer threads along (init_worker also turns them off)
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.update(writers=0, executor=None, slots=None, pending=[])
+        return state
+
+    def open(self, contest, colors):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def scoreboard_file_name(self, contest, current_voter_num):
+        return scoreboards.scoreboard_file_name(contest, current_voter_num, self.file_format)
+
+    def write_scoreboard(self, contest, current_voter_num, img):
+        self.write(img, os.path.join(self.directory, self.scoreboard_file_name(contest, current_voter_num)))
+
+    def write_summary(self, contest, img):
+        self.write(img, os.path.join(self.directory, scoreboards.summary_file_name(contest, self.file_format)))
+
+    '''
+    Writes a frame that is rendered in strips, as returned by scoreboards.scoreboard_strips and summary_strips.
+    Each strip is encoded as soon as it is drawn, so only PNG and raw images can be written this way.
+    '''
+    def write_strips(self, file_name, size, mode, strips):
+        with atomic_path(os.path.join(self.directory, file_name)) as temp, open(temp, 'wb') as file:
+            writer = PNGStreamWriter(file, size, mode, self.compress_level) if self.file_format == 'png' else None
+            for strip in strips:
+                with profiling.stage('encode'):
+                    if writer is None:
+                        file.write(strip.tobytes())
+                    else:
+                        writer.write(strip)
+            if writer is not None:
+                writer.close()
+
+    def write(self, img, path):
+        if self.writers <= 0:
+            save_frame(img, path, self.file_format, self.compress_level)
+            return
+
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(self.writers)
+            self.slots = threading.BoundedSemaphore(self.max_pending)
+        with profiling.stage('writer wait'):
+            self.slots.acquire()
+        future = self.executor.submit(save_frame, img, path, self.file_format, self.compress_level)
+        future.add_done_callback(lambda future: self.slots.release())
+        self.pending.append(future)
+
+        # Report any frame that failed to be written as soon as possible
+        done = [future for future in self.pending if future.done()]
+        self.pending = [future for future in self.pending if future not in done]
+        for future in done:
+            future.result()
+
+    # Wait until every frame handed over so far has been written
+    def flush(self):
+        pending = self.pending
+        self.pending = []
+        for future in pending:
+            future.result()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+
+'''
+Writes the frames into a single animated PNG as they arrive. Each frame is encoded by Pillow and
+its image data moved into the animation straight away, so no frame is kept once it has been written.
+'''
+class APNGOutput:
+    streaming = True
+
+    def __init__(self, path, frame_duration=1000, summary_duration=5000):
+        self.path = path
+        self.frame_duration = frame_duration
+        self.summary_duration = summary_duration
+        self.file = None
+
+    # The file is only created with the first frame, so a contest without voters doesn't leave an empty animation
+    def open(self, contest, colors):
+        self.num_frames = contest.num_voters + 1
+        self.sequence = 0
+
+    def write_scoreboard(self, contest, current_voter_num, img):
+        self.write_frame(img, self.frame_duration)
+
+    def write_summary(self, contest, img):
+        self.write_frame(img, self.summary_duration)
+
+    def write_frame(self, img, duration):
+        with profiling.stage('encode'):
+            chunks = encode_png(img)
+        if self.sequence == 0:
+            self.file = open(self.path, 'wb')
+            self.file.write(PNG_SIGNATURE)
+            write_chunk(self.file, b'IHDR', chunks[b'IHDR'][0])
+            write_chunk(self.file, b'acTL', struct.pack('>II', self.num_frames, 0))
+            self.size = img.size
+        elif img.size != self.size:
+            raise ValueError("All frames of an animation must be the same size")
+
+        # Frame control: sequence number, size, offset, delay (in ms), dispose and blend operations
+        write_chunk(self.file, b'fcTL', struct.pack('>IIIIIHHBB', self.sequence, img.width, img.height, 0, 0,
+                                                    int(duration), 1000, 0, 0))
+        first_frame = self.sequence == 0
+        self.sequence += 1
+        for data in chunks[b'IDAT']:
+            if first_frame:
+                write_chunk(self.file, b'IDAT', data)
+            else:
+                write_chunk(self.file, b'fdAT', struct.pack('>I', self.sequence) + data)
+                self.sequence += 1
+
+    def close(self):
+        if self.file is not None:
+            write_chunk(self.file, b'IEND', b'')
+            self.file.close()
+            self.file = None
+
+
+'''
+Writes the frames into an animated GIF. Pillow's GIF writer needs every frame before it can start,
+so frames are reduced to a 256 color palette as they arrive to keep the ones being held small.
+'''
+class GIFOutput:
+    streaming = True
+
+    def __init__(self, path, frame_duration=1000, summary_duration=5000):
+        self.path = path
+        self.frame_duration = frame_duration
+        self.summary_duration = summary_duration
+
+    def open(self, contest, colors):
+        self.background = colors['white']
+        self.frames = []
+        self.durations = []
+
+    def write_scoreboard(self, contest, current_voter_num, img):
+        with profiling.stage('encode'):
+            self.frames.append(flatten(img, self.background).quantize())
+        self.durations.append(self.frame_duration)
+
+    def write_summary(self, contest, img):
+        with profiling.stage('encode'):
+            self.frames.append(flatten(img, self.background).quantize())
+        self.durations.append(self.summary_duration)
+
+    def close(self):
+        if self.frames:
+            with profiling.stage('encode'):
+                self.frames[0].save(self.path, save_all=True, append_images=self.frames[1:], duration=self.durations, loop=0)
+        self.frames = []
+
+
+'''
+Streams the frames as raw RGB data into the standard input of an external encoder, e.g.
+    ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height} -r {rate} -i - scoreboards.mp4
+The command is started once the frame size is known. Frames are sent at a rate of one per frame_duration,
+and the summary is repeated so that it stays on screen for summary_duration.
+'''
+class PipeOutput:
+    streaming = True
+
+    def __init__(self, command, frame_duration=1000, summary_duration=5000):
+        self.command = command
+        self.frame_duration = frame_duration
+        self.summary_duration = summary_duration
+        self.process = None
+
+    def open(self, contest, colors):
+        self.background = colors['white']
+
+    def write_scoreboard(self, contest, current_voter_num, img):
+        self.write_frame(img, 1)
+
+    def write_summary(self, contest, img):
+        self.write_frame(img, max(1, int(round(float(self.summary_duration) / self.frame_duration))))
+
+    def write_frame(self, img, repeat):
+        if self.process is None:
+            self.size = img.size
+            command = self.command.format(width=img.width, height=img.height, rate=1000.0 / self.frame_duration)
+            self.process = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE)
+        elif img.size != self.size:
+            raise ValueError("All frames sent to an encoder must be the same size")
+
+        with profiling.stage('encode'):
+            data = flatten(img, self.background).tobytes()
+        for _ in range(repeat):
+            self.process.stdin.write(data)
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            returncode = self.process.wait()
+            self.process = None
+            if returncode != 0:
+                raise subprocess.CalledProcessError(returncode, self.command)
+
+
+# Returns the frame in RGB, with any transparent parts (e.g. from flags) flattened onto the given background color
+def flatten(img, background):
+    if img.mode == 'RGBA':
+        from PIL import Image
+        flattened = Image.new('RGBA', img.size, background)
+        flattened.alpha_composite(img)
+        img = flattened
+    return img.convert('RGB')
+
+
+# Chooses the output for the command line options, based on the animation file's extension
+def create_output(args):
+    if args.pipe is not None:
+        return PipeOutput(args.pipe, args.frame_duration, args.summary_duration)
+    if args.animate is not None:
+        if os.path.splitext(args.animate)[1].lower() == '.gif':
+            return GIFOutput(args.animate, args.frame_duration, args.summary_duration)
+        return APNGOutput(args.animate, args.frame_duration, args.summary_duration)
+    return DirectoryOutput('Output', args.format, args.compress_level, args.writers, args.max_pending)
+
+
+'''
+Writes a file under a temporary name, given to the with block, and renames it into place once the block is done,
+so that other programs and processes never see a partially written file. The temporary file is removed if the block
+fails. The caches on disk are told apart by their modification time, which mtime_ns sets before the rename.
+'''
+@contextlib.contextmanager
+def atomic_path(path, mtime_ns=None):
+    temp = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        yield temp
+        if mtime_ns is not None:
+            os.utime(temp, ns=(mtime_ns, mtime_ns))
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+# Saves a frame as PNG, lossless WebP or raw pixel data (in the frame's mode, without a header)
+def save_frame(img, path, file_format='png', compress_level=None):
+    with profiling.stage('encode'), atomic_path(path) as temp:
+        if file_format == 'raw':
+            with open(temp, 'wb') as file:
+                file.write(img.tobytes())
+        elif file_format == 'webp':
+            img.save(temp, format='WEBP', lossless=True)
+        elif compress_level is None:
+            img.save(temp, format='PNG')
+        else:
+            img.save(temp, format='PNG', compress_level=compress_level)
+
+
+'''
+Writes a PNG image a few rows at a time, as they are rendered. Every row is stored with PNG's "Up" filter
+(the difference from the row above), which suits the scoreboards' flat areas of color.
+'''
+class PNGStreamWriter:
+    def __init__(self, file, size, mode, compress_level=None):
+        import numpy as np
+        self.file = file
+        width, height = size
+        channels = {'RGB': 3, 'RGBA': 4}[mode]
+        self.previous = np.zeros(width * channels, dtype=np.uint8)
+        self.compressor = zlib.compressobj(6 if compress_level is None else compress_level)
+
+        file.write(PNG_SIGNATURE)
+        # Size, bit depth, color type (2 for RGB, 6 for RGBA), compression, filter and interlace methods
+        write_chunk(file, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2 if mode == 'RGB' else 6, 0, 0, 0))
+
+    def write(self, strip):
+        import numpy as np
+        rows = np.frombuffer(strip.tobytes(), dtype=np.uint8).reshape(strip.height, -1)
+        above = np.vstack((self.previous[np.newaxis], rows[:-1]))
+
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 2
+        np.subtract(rows, above, out=filtered[:, 1:])
+        self.previous = rows[-1]
+
+        data = self.compressor.compress(filtered.tobytes())
+        if data:
+            write_chunk(self.file, b'IDAT', data)
+
+    def close(self):
+        write_chunk(self.file, b'IDAT', self.compressor.flush())
+        write_chunk(self.file, b'IEND', b'')
+
+
+# Encode an image as a PNG and split it into its chunks, grouped by chunk type
+def encode_png(img):
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    data = buffer.getvalue()
+
+    chunks = {}
+    position = len(PNG_SIGNATURE)
+    while position < len(data):
+        length, chunk_type = struct.unpack('>I4s', data[position:position+8])
+        chunks.setdefault(chunk_type, []).append(data[position+8:position+8+length])
+        position += 12 + length
+    return chunks
+
+
+def write_chunk(file, chunk_type, data):
+    file.write(struct.pack('>I', len(data)))
+    file.write(chunk_type)
+    file.write(data)
+    file.write(struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
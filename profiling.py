@@ -0,0 +1,103 @@
+import json
+import os
+import sys
+import threading
+import time
+
+
+'''
+Records how long each stage of the pipeline takes, along with how many memory blocks it leaves allocated
+(from sys.getallocatedblocks, so it counts Python objects rather than image buffers). Stages can be nested,
+e.g. text drawing happens within a frame, and can run on other threads (e.g. background writers).
+Profiling is off by default, in which case stage() does nothing.
+'''
+class Profiler:
+    def __init__(self):
+        self.start = time.perf_counter()
+        # (name, start, duration, allocated blocks, args, thread) for every stage, in the order they finished
+        self.events = []
+
+    def stage(self, name, **args):
+        return Stage(self, name, args)
+
+    def add(self, name, start, duration, blocks, args):
+        self.events.append((name, start - self.start, duration, blocks, args, threading.get_ident()))
+
+    # Totals for each stage, in the order the stages first appeared
+    def totals(self):
+        totals = {}
+        for name, start, duration, blocks, args, thread in sorted(self.events, key=lambda event: event[1]):
+            total = totals.setdefault(name, [0, 0.0, 0.0, 0])
+            total[0] += 1
+            total[1] += duration
+            total[2] = max(total[2], duration)
+            total[3] += blocks
+        return totals
+
+    def print_summary(self):
+        print("\n{:<12} {:>7} {:>11} {:>10} {:>10} {:>12}".format('Stage', 'Calls', 'Total (ms)', 'Mean (ms)', 'Max (ms)', 'Alloc blocks'))
+        for name, (calls, total, longest, blocks) in self.totals().items():
+            print("{:<12} {:>7} {:>11.1f} {:>10.2f} {:>10.2f} {:>+12}".format(name, calls, total * 1000,
+                                                                         total * 1000 / calls, longest * 1000, blocks))
+
+        frames = [event for event in self.events if event[0] == 'frame']
+        if frames:
+            name, start, duration, blocks, args, thread = max(frames, key=lambda event: event[2])
+            print("Slowest frame: {} ({:.1f} ms)".format(args.get('voter', 'summary'), duration * 1000))
+
+    # Write the stages in Chrome's trace event format, which chrome://tracing and Perfetto can open
+    def write_trace(self, path):
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for name, start, duration, blocks, args, thread in self.events:
+            event_args = dict(args)
+            event_args['allocated_blocks'] = blocks
+            events.append({'name': name, 'cat': 'melbourne', 'ph': 'X', 'pid': pid, 'tid': threads.setdefault(thread, len(threads)),
+                           'ts': start * 1000000, 'dur': duration * 1000000, 'args': event_args})
+        with open(path, 'w', encoding='utf8') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file, ensure_ascii=False)
+
+
+class Stage:
+    __slots__ = ('profiler', 'name', 'args', 'start', 'blocks')
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.blocks = sys.getallocatedblocks()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        self.profiler.add(self.name, self.start, end - self.start, sys.getallocatedblocks() - self.blocks, self.args)
+        return False
+
+
+# Stands in for a stage when profiling is off
+class NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_null_stage = NullStage()
+
+
+_profiler = None
+
+def enable():
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def stage(name, **args):
+    if _profiler is None:
+        return _null_stage
+    return _profiler.stage(name, **args)
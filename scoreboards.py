@@ -1,9 +1,17 @@
-from PIL import Image, ImageDraw, ImageFont, ImageOps
-from unidecode import unidecode
-import json
+from collections import OrderedDict
+import countries
+import flag_cache
+import profiling
+import scoring
 import os
 
 
+'''
+PIL and unidecode are imported by the functions that need them rather than here, so that runs which
+only print the standings don't pay for loading them.
+'''
+
+
 def ordinalize(num):
     if num > 9:
         second_to_last_digit = str(num)[-2]
@@ -30,19 +38,6 @@ def hex_to_rgb(value):
     return tuple(int(value[i:i + lv // 3], 16) for i in range(0, lv, lv // 3))
 
 
-'''
-A helper function which loads a json file with various permissible country names
-(according to ISO standards), in order to map the two letter ISO code to the country's full name.
-'''
-def load_country_mappings():
-    flags = {}
-    with open("Resources/countries.json", encoding="utf8") as f:
-        temp = json.load(f)
-    for item in temp:
-        flags[item['name']] = item
-    return flags
-
-
 # Makes sure the output directory exists. If it doesn't it creates said directory.
 def create_output_dir():
     if not os.path.isdir('Output'):
@@ -54,19 +49,35 @@ Strips diacritics and other special characters from voter names for use in creat
 filesafe output file names
 '''
 def safe_file_name(file_name):
+    from unidecode import unidecode
     safe = file_name.strip()
     for c in r'[]/\;,><&*:%=+@!#^()|?^':
         safe = safe.replace(c,'')
     safe = unidecode(safe)
     return safe
 
+def scoreboard_file_name(contest, current_voter_num, extension='png'):
+    return '{} - {}.{}'.format(current_voter_num + 1, safe_file_name(contest.voters[current_voter_num]), extension)
+
+
+def summary_file_name(contest, extension='png'):
+    return '{} - Summary.{}'.format(safe_file_name(contest.name), extension)
+
+
+# Fonts are kept once loaded, since every contest rendered at the same scale uses the same ones
+_fonts = {}
+
 def load_fonts(scale):
+    from PIL import ImageFont
+    if scale in _fonts:
+        return _fonts[scale]
     fonts = {}
     fonts['voter_header'] = ImageFont.truetype("Resources/Fonts/Dosis-Regular.ttf", 12*scale, encoding="unic")
     fonts['header'] = ImageFont.truetype("Resources/Fonts/Dosis-Bold.ttf", 21*scale, encoding="unic")
     fonts['country'] = ImageFont.truetype("Resources/Fonts/Dosis-Regular.ttf", 10*scale, encoding="unic")
     fonts['awarded_pts'] = ImageFont.truetype("Resources/Fonts/Dosis-Light.ttf", 14*scale, encoding="unic")
     fonts['total_pts'] = ImageFont.truetype("Resources/Fonts/Dosis-Bold.ttf", 14*scale, encoding="unic")
+    _fonts[scale] = fonts
     return fonts
 
 
@@ -83,266 +94,589 @@ def load_colors(main_color="#2f292b", accent_color="#009688"):
     return colors
 
 
-def determine_image_size(fonts, contest, scale, current_voter_num):
-    img = Image.new('RGBA', size=(1,1))
-    draw = ImageDraw.Draw(img)
+'''
+Render quality modes, given as how many times larger than the output the scoreboards are drawn before
+being resized down. Drafts are drawn straight at the output resolution, so they skip resizing altogether.
+'''
+QUALITY_MODES = {'draft': 1, 'standard': 1.5, 'high': 2}
 
-    header_size = draw.textsize('{} Results'.format(contest.name), font=fonts['header'])
-    voter_header_size = draw.textsize('Now Voting: {} ({}/{})'.format(contest.voters[current_voter_num],
-            current_voter_num+1, contest.num_voters), font=fonts['voter_header'])
-    entry_size = (0,0)
-    user_size = (0,0)
-    for entry in contest.data:
-        temp_entry_size = draw.textsize("{} - {}".format(entry.artist, entry.song), font=fonts['country'])
-        if temp_entry_size[0] > entry_size[0]:
-            entry_size = temp_entry_size
-
-        if contest.display_countries:
-            temp_user_size = draw.textsize(entry.country, font=fonts['country'])
-        else:
-            temp_user_size = draw.textsize(entry.user, font=fonts['country'])
-        if temp_user_size[0] > user_size[0]:
-            user_size = temp_user_size
+class Quality:
+    def __init__(self, mode='high', resolution=2):
+        self.mode = mode
+        # Output resolution, in pixels per scoreboard unit
+        self.resolution = resolution
+        # Resolution the scoreboards are drawn at before being resized
+        self.scale = max(resolution, int(round(resolution * QUALITY_MODES[mode])))
 
-    flag_offset = 0
-    if contest.display_flags:
-        flag_offset = 24*scale
+    def __eq__(self, other):
+        return isinstance(other, Quality) and (self.mode, self.resolution) == (other.mode, other.resolution)
 
-    rectangle_width = max(entry_size[0], user_size[0]) + 80*scale + flag_offset
-    image_width = max((30*scale + 2*rectangle_width), (48*scale + header_size[0]), (10*scale + voter_header_size[0]))
-    image_height = scale*(90 + 30*(int(contest.num_entries/2) + contest.num_entries%2) + 20)
+    def __ne__(self, other):
+        return not self == other
 
-    return [(image_width, image_height), rectangle_width, flag_offset, entry_size, user_size]
+    def __hash__(self):
+        return hash((self.mode, self.resolution))
 
-# Generates a scoreboard image that is inspired by Google's Material Design design guidelines
-def generate_scoreboard(contest, sorted_data, current_voter_num, colors):
-    create_output_dir()
-    flags = load_country_mappings()
-    safe_voter_name = safe_file_name(contest.voters[current_voter_num])
-    scale = 4
 
-    fonts = load_fonts(scale)
+# How many layouts are kept at once, and how many sets of colors each layout keeps templates and row sprites for
+MAX_LAYOUTS = 4
+MAX_COLOR_SETS = 4
 
-    image_size = determine_image_size(fonts, contest, scale, current_voter_num)
-    image_width, image_height = image_size[0]
-    rectangle_width = image_size[1]
-    flag_offset = image_size[2]
-    entry_size = image_size[3]
-    user_size = image_size[4]
 
-    img = Image.new('RGBA', size=(image_width, image_height))
-    draw = ImageDraw.Draw(img)
+'''
+The geometry of a contest's scoreboards. Everything apart from the image width is the same in every frame,
+so the fonts are loaded and the entries are measured only once per contest. The width still depends on
+the voter header, since a long voter name can widen the image.
+'''
+class Layout:
+    def __init__(self, contest, quality):
+        from PIL import Image, ImageDraw
+        scale = quality.scale
+        self.contest = contest
+        self.quality = quality
+        self.scale = scale
+        self.fonts = load_fonts(scale)
+
+        # Flags can have transparent areas, which the scoreboards keep. Without them there's no need for an alpha channel.
+        self.mode = 'RGBA' if contest.display_flags else 'RGB'
+
+        # How many times larger a frame is drawn than it is output, if it's a whole number
+        self.factor = None
+        if scale % quality.resolution == 0:
+            self.factor = scale // quality.resolution
+        self.draw = ImageDraw.Draw(Image.new(self.mode, size=(1,1)))
+        self.text_sizes = {}
+        # Both are only kept for the MAX_COLOR_SETS colors used most recently, as the server can be asked for any colors
+        self.templates = OrderedDict()
+        self.sprites = OrderedDict()
+
+        self.header_size = self.draw.textsize('{} Results'.format(contest.name), font=self.fonts['header'])
+        self.entry_size = (0,0)
+        self.user_size = (0,0)
+        for entry in contest.data:
+            temp_entry_size = self.draw.textsize("{} - {}".format(entry.artist, entry.song), font=self.fonts['country'])
+            if temp_entry_size[0] > self.entry_size[0]:
+                self.entry_size = temp_entry_size
+
+            if contest.display_countries:
+                temp_user_size = self.draw.textsize(entry.country, font=self.fonts['country'])
+            else:
+                temp_user_size = self.draw.textsize(entry.user, font=self.fonts['country'])
+            if temp_user_size[0] > self.user_size[0]:
+                self.user_size = temp_user_size
+
+        self.flag_offset = 0
+        if contest.display_flags:
+            self.flag_offset = 24*scale
+
+        self.rectangle_width = max(self.entry_size[0], self.user_size[0]) + 80*scale + self.flag_offset
+
+        # Number of entries to place in each column of the scoreboard, filling them from left to right
+        self.columns = contest.columns
+        self.rows = -(-contest.num_entries // self.columns)
+        self.image_height = scale*(90 + 30*self.rows + 20)
+
+        # Distance from the left edge of a column to the box showing an entry's total points
+        self.points_offset = 20*scale + self.flag_offset + max(self.entry_size[0], self.user_size[0]) + 10*scale
+
+    # Measures a string, remembering the result since the same point values come up in every frame
+    def text_size(self, text, font):
+        size = self.text_sizes.get((text, font))
+        if size is None:
+            size = self.draw.textsize(text, font=self.fonts[font])
+            self.text_sizes[(text, font)] = size
+        return size
+
+    def image_size(self, voter_header):
+        scale = self.scale
+        voter_header_size = self.draw.textsize(voter_header, font=self.fonts['voter_header'])
+        image_width = max((10*scale + self.columns*(10*scale + self.rectangle_width)), (48*scale + self.header_size[0]), (10*scale + voter_header_size[0]))
+        return (image_width, self.image_height)
+
+    def output_size(self, image_size):
+        image_width, image_height = image_size
+        return (int(image_width * self.quality.resolution / self.scale), int(image_height * self.quality.resolution / self.scale))
+
+    # Resize a frame from the size it was drawn at down to the output size
+    def resize(self, img):
+        from PIL import Image
+        if self.factor == 1:
+            return img
+        return img.resize(self.output_size(img.size), Image.ANTIALIAS)
+
+    # The size of the widest frame in the contest, used when every frame has to be the same size
+    def max_image_size(self):
+        widths = [self.image_size(voter_header(self.contest, current_voter_num))[0]
+                  for current_voter_num in range(self.contest.num_voters)]
+        return (max(widths), self.image_height)
+
+    # Returns the x and y offsets of the given place on the scoreboard
+    def entry_position(self, current_entry):
+        column, y_offset = divmod(current_entry, self.rows)
+        return column*(10*self.scale + self.rectangle_width), y_offset
+
+    # Returns the area taken up by the given place, without the column's outline or the dividing lines around it
+    def entry_box(self, current_entry):
+        scale = self.scale
+        x_offset, y_offset = self.entry_position(current_entry)
+        return (10*scale + x_offset + 1, 90*scale + 30*scale*y_offset + 1,
+                10*scale + self.rectangle_width + x_offset, 120*scale + 30*scale*y_offset)
+
+    '''
+    Returns a fresh copy of the contest's template to draw a frame onto. The template is only drawn again
+    when a frame is wider than any before it: as the bars span the whole image, a narrower frame is just a crop.
+    '''
+    def new_frame(self, colors, image_size):
+        image_width, image_height = image_size
+        return self.template(colors, image_size).crop((0, 0, image_width, image_height))
+
+    def template(self, colors, image_size):
+        key = tuple(sorted(colors.items()))
+        template = self.templates.get(key)
+        if template is None or template.width < image_size[0]:
+            with profiling.stage('template'):
+                template = draw_template(self, colors, image_size)
+            self.templates[key] = template
+        self.templates.move_to_end(key)
+        while len(self.templates) > MAX_COLOR_SETS:
+            self.templates.popitem(last=False)
+        return template
+
+    '''
+    Returns the entry's row sprite, drawing it the first time it is needed for these colors. Sprites are kept
+    for each combination of the colors they are drawn with, unless cache is off (frames drawn in strips to save
+    memory draw them every time instead).
+    '''
+    def row_sprite(self, colors, flags, entry, cache=True):
+        if not cache:
+            return draw_row_sprite(self, colors, flags, entry)
+        color_key = (colors['white'], colors['text_caption'], colors['black'], colors['text_grey'])
+        sprites = self.sprites.get(color_key)
+        if sprites is None:
+            sprites = self.sprites[color_key] = {}
+        self.sprites.move_to_end(color_key)
+        while len(self.sprites) > MAX_COLOR_SETS:
+            self.sprites.popitem(last=False)
+
+        key = (entry.user, entry.country, entry.artist, entry.song)
+        sprite = sprites.get(key)
+        if sprite is None:
+            sprite = draw_row_sprite(self, colors, flags, entry)
+            sprites[key] = sprite
+        return sprite
+
+    # Paints the template back over part of a frame, erasing whatever was drawn there
+    def restore(self, img, colors, box):
+        img.paste(self.template(colors, img.size).crop(box), box[:2])
+
+
+# Returns the layout for the contest, keeping the few most recently used so that switching between qualities is cheap
+_layouts = OrderedDict()
+
+def get_layout(contest, quality=None):
+    quality = quality or Quality()
+    key = (contest, quality)
+    layout = _layouts.get(key)
+    if layout is None:
+        with profiling.stage('layout'):
+            layout = Layout(contest, quality)
+        _layouts[key] = layout
+    _layouts.move_to_end(key)
+    while len(_layouts) > MAX_LAYOUTS:
+        _layouts.popitem(last=False)
+    return layout
+
+
+# The width of the contest's widest frame, before it is resized
+def max_image_width(contest, quality=None):
+    return get_layout(contest, quality).max_image_size()[0]
+
+
+def voter_header(contest, current_voter_num):
+    return "Now Voting: {} ({}/{})".format(contest.voters[current_voter_num], current_voter_num+1, contest.num_voters)
+
+
+'''
+Draws the parts of a scoreboard which are the same in every frame: the background, both top bars,
+the contest name, and the columns along with the dividing lines between their rows.
+'''
+def draw_template(layout, colors, image_size):
+    from PIL import Image, ImageDraw
+    img = Image.new(layout.mode, size=image_size)
+    paint_template(ImageDraw.Draw(img), layout, colors, image_size)
+    return img
+
+
+def paint_template(draw, layout, colors, image_size):
+    contest = layout.contest
+    scale = layout.scale
+    rectangle_width = layout.rectangle_width
+    rows = layout.rows
+    image_width, image_height = image_size
 
     # Background rectangle for scoreboard
     draw.rectangle(((0,0), (image_width, image_height)), fill=colors['light_grey'])
 
     # Voting Top Bar
     draw.rectangle(((0,0), (image_width, 21*scale)), fill=colors['main'])
-    draw.text((5*scale, 3*scale), "Now Voting: {} ({}/{})".format(contest.voters[current_voter_num],
-            current_voter_num+1, contest.num_voters), fill=colors['text_white'], font=fonts['voter_header'])
     # Contest Name Top Bar
     draw.rectangle(((0, 20*scale), (image_width, 65*scale)), fill=colors['accent'])
-    draw.text((24 * scale, 31 * scale), "{} Results".format(contest.name), fill=colors['text_white'], font=fonts['header'])
-
-    # Determine number of entries to place on left column of scoreboard
-    left_column = int(contest.num_entries/2) + contest.num_entries%2
+    draw.text((24 * scale, 31 * scale), "{} Results".format(contest.name), fill=colors['text_white'], font=layout.fonts['header'])
 
-    # Background rectangles for the two columns
-    draw.rectangle(((10*scale, 90*scale), (10*scale + rectangle_width, 90*scale+30*scale*left_column)),
-                fill=colors['white'], outline=colors['text_grey'])
-    draw.rectangle(((20*scale+rectangle_width, 90*scale), (20*scale + 2*rectangle_width, 90*scale+30*scale*left_column)),
-                fill=colors['white'], outline=colors['text_grey'])
+    # Background rectangles for the columns
+    for column in range(layout.columns):
+        x_offset = column*(10*scale + rectangle_width)
+        draw.rectangle(((10*scale + x_offset, 90*scale), (10*scale + rectangle_width + x_offset, 90*scale+30*scale*rows)),
+                    fill=colors['white'], outline=colors['text_grey'])
 
-    # Now place each entry onto the scoreboard
     for current_entry in range(contest.num_entries):
-        if current_entry < left_column:
-            x_offset = 0
-            y_offset = current_entry
-        else:
-            x_offset = 10*scale + rectangle_width
-            y_offset = current_entry - left_column
+        x_offset, y_offset = layout.entry_position(current_entry)
 
-        entry = sorted_data[current_entry]
+        # Draw a dividing line between entries, apart from below the last row where the column's outline is
+        if y_offset != rows - 1:
+            draw.line((10 * scale + x_offset, 120 * scale + 30 * scale * y_offset, 10 * scale + rectangle_width + x_offset,
+                       120 * scale + 30 * scale * y_offset), fill=colors['text_grey'], width=1)
 
-        if contest.display_flags:
-            try:
-                category = flags[entry.country]['category']
-                country_iso = flags[entry.country]['alpha-2']
 
-                flag = Image.open('Resources/Flags/{}/{}.png'.format(category, country_iso), 'r')
-                flag_width, flag_height = flag.size
+'''
+The last scoreboard drawn, kept so that the next one only has to repaint the rows that changed.
+Along with the full size image, it keeps the resized image that was saved and what each row showed.
+'''
+class PreviousFrame:
+    def __init__(self, layout, colors, img, resized, rows):
+        self.layout = layout
+        self.colors = colors
+        self.img = img
+        self.resized = resized
+        self.rows = rows
 
-                if flag_width < flag_height:
-                    flag = flag.resize((int((float(flag_width) / flag_height) * 20 * scale), 20 * scale), Image.ANTIALIAS)
-                elif flag_width == flag_height:
-                    flag = flag.resize((20 * scale, 20 * scale), Image.ANTIALIAS)
-                else:
-                    flag = flag.resize((20 * scale, int((float(flag_height) / flag_width) * 20 * scale)), Image.ANTIALIAS)
-                flag = ImageOps.expand(flag, border=1, fill=colors['text_grey'])
+_previous_frame = None
 
-                img.paste(flag, (int(20 * scale + 10 * scale - flag.width / 2.0) + x_offset,
-                                 int(95 * scale + 10 * scale - flag.height / 2.0 + 30 * y_offset * scale)))
 
-            except IndexError:
-                country_iso = ""
+# Everything that is shown in a row of the scoreboard, used to tell whether it has to be drawn again
+def row_contents(entry, current_voter_num):
+    return (entry.user, entry.country, entry.artist, entry.song, entry.display_pts, scoring.format_vote(entry.voters[current_voter_num]))
 
-            except KeyError:
-                country_iso = ""
 
-        # Display either the entry artist's country of origin or the user's name
-        if contest.display_countries:
-            country_string = entry.country
-        else:
-            country_string = entry.user
+'''
+Draws the parts of an entry's row which are the same in every frame and in the summary: its flag, the caption
+(either the artist's country or the user's name) and "artist - song", on the row's background. The sprite starts
+at the top left of the row's entry_box, and is only as wide as what is drawn on it.
+'''
+def draw_row_sprite(layout, colors, flags, entry):
+    from PIL import Image
+    contest = layout.contest
+    scale = layout.scale
+    fonts = layout.fonts
+    flag_offset = layout.flag_offset
+
+    # Display either the entry artist's country of origin or the user's name
+    if contest.display_countries:
+        country_string = entry.country
+    else:
+        country_string = entry.user
+    song_string = "{} - {}".format(entry.artist, entry.song)
 
-        draw.text((20*scale+x_offset+flag_offset, 93*scale+30*scale*y_offset), country_string,
+    # Leave some room for glyphs reaching past their advance, but stop short of the points boxes
+    text_width = max(layout.draw.textsize(country_string, font=fonts['country'])[0],
+                     layout.draw.textsize(song_string, font=fonts['country'])[0])
+    left, top = 10*scale + 1, 90*scale + 1
+    width = min(layout.points_offset, 20*scale + flag_offset + text_width + 2*scale) - left
+    sprite = Image.new(layout.mode, (width, 30*scale - 1), colors['white'])
+    img = draw = StripDraw(sprite, top, left)
+
+    if contest.display_flags:
+        with profiling.stage('flags'):
+            try:
+                flag = flag_cache.get_flag(flags[entry.country], scale, colors['text_grey'])
+
+                img.paste(flag, (int(20 * scale + 10 * scale - flag.width / 2.0),
+                                 int(95 * scale + 10 * scale - flag.height / 2.0)))
+
+            except KeyError:
+                # Countries without a flag are left blank
+                pass
+
+    with profiling.stage('text'):
+        draw.text((20*scale+flag_offset, 93*scale), country_string,
                 fill=colors['text_caption'], font=fonts['country'])
 
         # Display the entry's artist and song title
-        draw.text((20*scale+x_offset+flag_offset, 105.5*scale+30*scale*y_offset), "{} - {}".format(entry.artist, entry.song),
+        draw.text((20*scale+flag_offset, 105.5*scale), song_string,
                 fill=colors['black'], font=fonts['country'])
+    return sprite
 
-        # Display the total points the entry currently has
-        draw.rectangle(((20*scale+x_offset+flag_offset+max(entry_size[0],user_size[0])+10*scale, 95*scale+30*scale*y_offset),
-                (20*scale+x_offset+flag_offset+max(entry_size[0],user_size[0])+10*scale+27*scale,
-                 95*scale+30*scale*y_offset+20*scale)), fill=colors['main'])
-        total_size = draw.textsize("{}".format(entry.display_pts), font=fonts['total_pts'])
-        draw.text((20*scale+x_offset+flag_offset+max(entry_size[0],user_size[0])+10*scale+(27/2)*scale-(total_size[0]/2.0),
-                95*scale+30*scale*y_offset), "{}".format(entry.display_pts), fill=colors['text_white'], font=fonts['total_pts'])
-
-        # Display the points awarded by the current voter
-        if entry.voters[current_voter_num] != 0 and entry.voters[current_voter_num] != '':
-            draw.rectangle(((20*scale+x_offset+flag_offset+max(entry_size[0],user_size[0])+10*scale+27*scale, 95*scale+30*scale*y_offset),
-                    (20*scale+x_offset+flag_offset+max(entry_size[0],user_size[0])+10*scale+27*scale+23*scale,
-                    95*scale+30*scale*y_offset+20*scale)), fill=colors['accent'])
-            awarded_size = draw.textsize("{}".format(entry.voters[current_voter_num]), font=fonts['awarded_pts'])
-            draw.text((20*scale+x_offset+flag_offset+max(entry_size[0],user_size[0])+10*scale+27*scale+(22/2.0)*scale-(awarded_size[0]/2.0),
-                    95*scale+30*scale*y_offset), "{}".format(entry.voters[current_voter_num]),
-                    fill=colors['text_white'], font=fonts['awarded_pts'])
-
-        # Draw a dividing line between entries
-        if current_entry + 1 != left_column and current_entry + 1 != contest.num_entries:
-            draw.line((10 * scale + x_offset, 120 * scale + 30 * scale * y_offset, 10 * scale + rectangle_width + x_offset,
-                       120 * scale + 30 * scale * y_offset), fill=colors['text_grey'], width=1)
-        if current_entry + 1 == contest.num_entries and left_column != contest.num_entries/2:
-            draw.line((10 * scale + x_offset, 120 * scale + 30 * scale * y_offset, 10 * scale + rectangle_width + x_offset,
-                   120 * scale + 30 * scale * y_offset), fill=colors['text_grey'], width=1)
 
-    img = img.resize((int(image_width/2), int(image_height/2)), Image.ANTIALIAS)
-    img.save('{}/{} - {}.png'.format('Output', current_voter_num + 1, safe_voter_name))
+def draw_entry(img, draw, layout, colors, flags, current_entry, entry, current_voter_num, cache_sprite=True):
+    scale = layout.scale
+    fonts = layout.fonts
+    points_offset = layout.points_offset
+    x_offset, y_offset = layout.entry_position(current_entry)
 
+    # The flag, caption and song are the same in every frame, so they are drawn once and pasted in
+    img.paste(layout.row_sprite(colors, flags, entry, cache_sprite), layout.entry_box(current_entry)[:2])
 
-# Generates a summary image for the contest results inspired by Google's Material Design design guidelines
-def generate_summary(contest, sorted_data, colors):
-    create_output_dir()
-    flags = load_country_mappings()
-    safe_contest_name = safe_file_name(contest.name)
-    scale = 4
+    # Display the total points the entry currently has
+    draw.rectangle(((x_offset+points_offset, 95*scale+30*scale*y_offset),
+            (x_offset+points_offset+27*scale, 95*scale+30*scale*y_offset+20*scale)), fill=colors['main'])
+    total_size = layout.text_size("{}".format(entry.display_pts), 'total_pts')
+    draw.text((x_offset+points_offset+(27/2)*scale-(total_size[0]/2.0),
+            95*scale+30*scale*y_offset), "{}".format(entry.display_pts), fill=colors['text_white'], font=fonts['total_pts'])
 
-    fonts = load_fonts(scale)
+    # Display the points awarded by the current voter
+    awarded = scoring.format_vote(entry.voters[current_voter_num])
+    if awarded != '':
+        draw.rectangle(((x_offset+points_offset+27*scale, 95*scale+30*scale*y_offset),
+                (x_offset+points_offset+27*scale+23*scale, 95*scale+30*scale*y_offset+20*scale)), fill=colors['accent'])
+        awarded_size = layout.text_size(awarded, 'awarded_pts')
+        draw.text((x_offset+points_offset+27*scale+(22/2.0)*scale-(awarded_size[0]/2.0),
+                95*scale+30*scale*y_offset), awarded, fill=colors['text_white'], font=fonts['awarded_pts'])
 
-    image_size = determine_image_size(fonts, contest, scale, contest.num_voters-1)
-    image_width, image_height = image_size[0]
-    rectangle_width = image_size[1]
-    flag_offset = image_size[2]
-    entry_size = image_size[3]
-    user_size = image_size[4]
 
-    img = Image.new('RGBA', size=(image_width, image_height))
-    draw = ImageDraw.Draw(img)
+'''
+Resizes the rows of a full size frame between top and bottom, and pastes them into the already resized frame.
+Whole rows of pixels are resized, with enough of a margin around them that the resampling filter sees exactly
+the same pixels as when resizing the full image. This means the result is identical to resizing everything.
+This only works when the frame is being shrunk by a whole number factor.
+'''
+def resize_band(img, resized, top, bottom, factor):
+    from PIL import Image
+    margin = 4*factor
+    band_top = max(0, top - top % factor - margin)
+    band_bottom = min(img.height, bottom + (-bottom) % factor + margin)
 
-    # Background rectangle for scoreboard
-    draw.rectangle(((0,0), (image_width, image_height)), fill=colors['light_grey'])
+    band = img.crop((0, band_top, img.width, band_bottom))
+    band = band.resize((resized.width, (band_bottom - band_top) // factor), Image.ANTIALIAS)
+
+    # Only keep the part of the band that isn't affected by its edges
+    keep_top = top // factor - band_top // factor
+    keep_bottom = -(-bottom // factor) - band_top // factor
+    resized.paste(band.crop((0, keep_top, resized.width, keep_bottom)), (0, top // factor))
+
+
+'''
+Renders a scoreboard image that is inspired by Google's Material Design design guidelines.
+An image_width can be given to make the frame wider than it needs to be, e.g. so all frames of an animation match.
+'''
+def render_scoreboard(contest, sorted_data, current_voter_num, colors, image_width=None, quality=None):
+    from PIL import ImageDraw
+    global _previous_frame
+    flags = countries.get_registry()
+
+    layout = get_layout(contest, quality)
+    scale = layout.scale
+    fonts = layout.fonts
+
+    header = voter_header(contest, current_voter_num)
+    image_width = max(layout.image_size(header)[0], image_width or 0)
+    image_height = layout.image_height
+    rows = [row_contents(entry, current_voter_num) for entry in sorted_data]
+
+    # Start from the previous frame if it has the same layout, and find the rows which have changed since it was drawn
+    previous = _previous_frame
+    if previous is not None and previous.layout is layout and previous.colors == colors and \
+            previous.img.size == (image_width, image_height):
+        img = previous.img
+        resized = previous.resized
+        dirty = [current_entry for current_entry in range(contest.num_entries)
+                 if rows[current_entry] != previous.rows[current_entry]]
+        layout.restore(img, colors, (0, 0, image_width, 65*scale))
+        for current_entry in dirty:
+            layout.restore(img, colors, layout.entry_box(current_entry))
+    else:
+        img = layout.new_frame(colors, (image_width, image_height))
+        resized = None
+        dirty = range(contest.num_entries)
+    draw = ImageDraw.Draw(img)
 
     # Voting Top Bar
-    draw.rectangle(((0,0), (image_width, 21*scale)), fill=colors['main'])
-    draw.text((5*scale, 3*scale), "Final Results", fill=colors['text_white'], font=fonts['voter_header'])
-    # Contest Name Top Bar
-    draw.rectangle(((0, 20*scale), (image_width, 65*scale)), fill=colors['accent'])
-    draw.text((24 * scale, 31 * scale), "{} Results".format(contest.name), fill=colors['text_white'], font=fonts['header'])
+    draw.text((5*scale, 3*scale), header, fill=colors['text_white'], font=fonts['voter_header'])
+
+    # Now place each entry that has changed onto the scoreboard
+    for current_entry in dirty:
+        draw_entry(img, draw, layout, colors, flags, current_entry, sorted_data[current_entry], current_voter_num)
+
+    with profiling.stage('downsample'):
+        if layout.factor == 1:
+            # Drafts are drawn at the output size, so there is nothing to resize
+            resized = img
+        elif resized is None or layout.factor is None:
+            resized = layout.resize(img)
+        else:
+            # Rows level with each other in the two columns share a band, so only resize each band once
+            bands = {(0, 65*scale)}
+            for current_entry in dirty:
+                box = layout.entry_box(current_entry)
+                bands.add((box[1], box[3]))
+            for top, bottom in sorted(bands):
+                resize_band(img, resized, top, bottom, layout.factor)
+
+    # The next frame is drawn over these images, so hand back a copy
+    _previous_frame = PreviousFrame(layout, colors, img, resized, rows)
+    return resized.copy()
+
+
+def generate_scoreboard(contest, sorted_data, current_voter_num, colors, quality=None):
+    create_output_dir()
+    img = render_scoreboard(contest, sorted_data, current_voter_num, colors, quality=quality)
+    img.save('{}/{}'.format('Output', scoreboard_file_name(contest, current_voter_num)))
+
+
+def draw_summary_entry(img, draw, layout, colors, flags, current_entry, entry, cache_sprite=True):
+    scale = layout.scale
+    fonts = layout.fonts
+    points_offset = layout.points_offset
+    x_offset, y_offset = layout.entry_position(current_entry)
+
+    # The flag, caption and song are the same in every frame, so they are drawn once and pasted in
+    img.paste(layout.row_sprite(colors, flags, entry, cache_sprite), layout.entry_box(current_entry)[:2])
 
-    # Determine number of entries to place on left column of scoreboard
-    left_column = int(contest.num_entries/2) + contest.num_entries%2
+    # Display the total points the entry received
+    draw.rectangle(((x_offset+points_offset, 95*scale+30*scale*y_offset),
+            (x_offset+points_offset+27*scale, 95*scale+30*scale*y_offset+20*scale)), fill=colors['main'])
+    total_size = layout.text_size("{}".format(entry.display_pts), 'total_pts')
+    draw.text((x_offset+points_offset+(27/2.0)*scale-(total_size[0]/2.0),
+            97.5*scale+30*scale*y_offset), "{}".format(entry.display_pts), fill=colors['text_white'], font=fonts['total_pts'])
 
-    # Background rectangles for the two columns
-    draw.rectangle(((10*scale, 90*scale), (10*scale + rectangle_width, 90*scale+30*scale*left_column)),
-                fill=colors['white'], outline=colors['text_grey'])
-    draw.rectangle(((20*scale+rectangle_width, 90*scale), (20*scale + 2*rectangle_width, 90*scale+30*scale*left_column)),
-                fill=colors['white'], outline=colors['text_grey'])
+    # Display the place the entry came in
+    draw.rectangle(((x_offset+points_offset+27*scale, 95*scale+30*scale*y_offset),
+            (x_offset+points_offset+27*scale+23*scale, 95*scale+30*scale*y_offset+20*scale)), fill=colors['accent'])
+    place_size = layout.text_size("{}".format(current_entry+1), 'awarded_pts')
+    draw.text((x_offset+points_offset+27*scale+(22/2.0)*scale-(place_size[0]/2.0), 97.5*scale+30*scale*y_offset),
+            "{}".format(current_entry+1), fill=colors['text_white'], font=fonts['awarded_pts'])
+
+
+# Renders a summary image for the contest results inspired by Google's Material Design design guidelines
+def render_summary(contest, sorted_data, colors, image_width=None, quality=None):
+    from PIL import ImageDraw
+    flags = countries.get_registry()
+
+    layout = get_layout(contest, quality)
+    scale = layout.scale
+    fonts = layout.fonts
+
+    # The summary is as wide as the last voter's scoreboard
+    image_width = max(layout.image_size(voter_header(contest, contest.num_voters-1))[0], image_width or 0)
+    image_height = layout.image_height
+
+    img = layout.new_frame(colors, (image_width, image_height))
+    draw = ImageDraw.Draw(img)
+
+    # Voting Top Bar
+    draw.text((5*scale, 3*scale), "Final Results", fill=colors['text_white'], font=fonts['voter_header'])
 
     # Now place each entry onto the scoreboard
     for current_entry in range(contest.num_entries):
-        if current_entry < left_column:
-            x_offset = 0
-            y_offset = current_entry
-        else:
-            x_offset = 10*scale + rectangle_width
-            y_offset = current_entry - left_column
+        draw_summary_entry(img, draw, layout, colors, flags, current_entry, sorted_data[current_entry])
 
-        entry = sorted_data[current_entry]
+    with profiling.stage('downsample'):
+        return layout.resize(img)
 
-        if contest.display_flags:
-            try:
-                category = flags[entry.country]['category']
-                country_iso = flags[entry.country]['alpha-2']
 
-                flag = Image.open('Resources/Flags/{}/{}.png'.format(category, country_iso), 'r')
-                flag_width, flag_height = flag.size
+def generate_summary(contest, sorted_data, colors, quality=None):
+    create_output_dir()
+    img = render_summary(contest, sorted_data, colors, quality=quality)
+    img.save('{}/{}'.format('Output', summary_file_name(contest)))
+
 
-                if flag_width < flag_height:
-                    flag = flag.resize((int((float(flag_width) / flag_height) * 20 * scale), 20 * scale), Image.ANTIALIAS)
-                elif flag_width == flag_height:
-                    flag = flag.resize((20 * scale, 20 * scale), Image.ANTIALIAS)
-                else:
-                    flag = flag.resize((20 * scale, int((float(flag_height) / flag_width) * 20 * scale)), Image.ANTIALIAS)
-                flag = ImageOps.expand(flag, border=1, fill=colors['text_grey'])
 
-                img.paste(flag, (int(20 * scale + 10 * scale - flag.width / 2.0) + x_offset,
-                                 int(95 * scale + 10 * scale - flag.height / 2.0 + 30 * y_offset * scale)))
+'''
+Draws onto part of a frame, e.g. a horizontal strip or a row's sprite, which starts at (left, top), using the
+coordinates of the whole frame. It stands in for both the image and the ImageDraw that the drawing functions are given.
+'''
+class StripDraw:
+    def __init__(self, img, top, left=0):
+        from PIL import ImageDraw
+        self.img = img
+        self.draw = ImageDraw.Draw(img)
+        self.top = top
+        self.left = left
 
-            except IndexError:
-                country_iso = ""
+    def text(self, xy, text, **kwargs):
+        self.draw.text((xy[0] - self.left, xy[1] - self.top), text, **kwargs)
 
-            except KeyError:
-                country_iso = ""
+    def rectangle(self, xy, **kwargs):
+        (x0, y0), (x1, y1) = xy
+        self.draw.rectangle(((x0 - self.left, y0 - self.top), (x1 - self.left, y1 - self.top)), **kwargs)
 
-        # Display either the entry artist's country of origin or the user's name
-        if contest.display_countries:
-            country_string = entry.country
-        else:
-            country_string = entry.user
-        draw.text((20*scale+x_offset+flag_offset, 93*scale+30*scale*y_offset), country_string,
-                fill=colors['text_caption'], font=fonts['country'])
+    def line(self, xy, **kwargs):
+        x0, y0, x1, y1 = xy
+        self.draw.line((x0 - self.left, y0 - self.top, x1 - self.left, y1 - self.top), **kwargs)
 
-        # Display the entry's artist and song title
-        draw.text((20*scale+x_offset+flag_offset, 105.5*scale+30*scale*y_offset), "{} - {}".format(entry.artist, entry.song),
-                fill=colors['black'], font=fonts['country'])
+    def paste(self, im, box):
+        self.img.paste(im, (box[0] - self.left, box[1] - self.top))
 
-        # Display the total points the entry received
-        draw.rectangle(((20*scale+x_offset+flag_offset+max(entry_size[0],user_size[0])+10*scale, 95*scale+30*scale*y_offset),
-                (20*scale+x_offset+flag_offset+max(entry_size[0],user_size[0])+10*scale+27*scale,
-                 95*scale+30*scale*y_offset+20*scale)), fill=colors['main'])
-        total_size = draw.textsize("{}".format(entry.display_pts), font=fonts['total_pts'])
-        draw.text((20*scale+x_offset+flag_offset+max(entry_size[0],user_size[0])+10*scale+(27/2.0)*scale-(total_size[0]/2.0),
-                97.5*scale+30*scale*y_offset), "{}".format(entry.display_pts), fill=colors['text_white'], font=fonts['total_pts'])
-
-        # Display the place the entry came in
-        draw.rectangle(((20 * scale + x_offset + flag_offset + max(entry_size[0], user_size[0]) + 10 * scale + 27 * scale,
-                95 * scale + 30 * scale * y_offset), (20 * scale + x_offset + flag_offset +
-                max(entry_size[0], user_size[0]) + 10 * scale + 27 * scale + 23 * scale, 95 * scale + 30 * scale * y_offset +
-                20 * scale)), fill=colors['accent'])
-        place_size = draw.textsize("{}".format(current_entry+1), font=fonts['awarded_pts'])
-        draw.text((20 * scale + x_offset + flag_offset + max(entry_size[0], user_size[0]) + 10 * scale + 27 * scale +
-                (22/2.0) * scale - (place_size[0] / 2.0), 97.5 * scale + 30 * scale * y_offset),
-                "{}".format(current_entry+1), fill=colors['text_white'], font=fonts['awarded_pts'])
-
-        # Draw a dividing line between entries
-        if current_entry + 1 != left_column and current_entry + 1 != contest.num_entries:
-            draw.line((10 * scale + x_offset, 120 * scale + 30 * scale * y_offset, 10 * scale + rectangle_width + x_offset,
-                       120 * scale + 30 * scale * y_offset), fill=colors['text_grey'], width=1)
-        if current_entry + 1 == contest.num_entries and left_column != contest.num_entries / 2:
-            draw.line((10 * scale + x_offset, 120 * scale + 30 * scale * y_offset, 10 * scale + rectangle_width + x_offset,
-                   120 * scale + 30 * scale * y_offset), fill=colors['text_grey'], width=1)
 
-    img = img.resize((int(image_width/2), int(image_height/2)), Image.ANTIALIAS)
-    img.save('{}/{} - Summary.png'.format('Output', safe_contest_name))
\ No newline at end of file
+'''
+Draws a frame strip_rows rows of entries at a time, resizing each strip and yielding it from top to bottom,
+so that only a strip of the frame is ever held in memory rather than the whole frame.
+Each strip is drawn along with the row either side of it, which gives the resampling filter the same pixels
+as when resizing the whole frame, so the strips join up into exactly the same image. Strips always start at
+the top of a row so that no text is drawn above the strip, which would place it differently.
+draw_place is called with the StripDraw and the place of each entry to draw.
+'''
+def frame_strips(layout, colors, image_size, top_text, draw_place, strip_rows):
+    from PIL import Image
+    contest = layout.contest
+    scale = layout.scale
+    image_width, image_height = image_size
+    output_width, output_height = layout.output_size(image_size)
+    row_top = lambda row: 90*scale + 30*scale*row
+
+    # Where each strip starts, both in the frame as it is drawn and once it is resized
+    cuts = [0] + [row_top(row) for row in range(strip_rows, layout.rows, strip_rows)] + [image_height]
+    output_cuts = [int(cut * output_height / image_height) for cut in cuts]
+
+    for top, bottom, output_top, output_bottom in zip(cuts, cuts[1:], output_cuts, output_cuts[1:]):
+        canvas_top = top - 30*scale if top > 0 else 0
+        canvas_bottom = min(image_height, bottom + 30*scale)
+        canvas = Image.new(layout.mode, size=(image_width, canvas_bottom - canvas_top))
+        strip = StripDraw(canvas, canvas_top)
+
+        paint_template(strip, layout, colors, image_size)
+        if canvas_top == 0:
+            strip.text((5*scale, 3*scale), top_text, fill=colors['text_white'], font=layout.fonts['voter_header'])
+
+        first_row = max(0, (canvas_top - 90*scale) // (30*scale))
+        last_row = min(layout.rows, -(-(canvas_bottom - 90*scale) // (30*scale)))
+        for row in range(first_row, last_row):
+            for column in range(layout.columns):
+                current_entry = column*layout.rows + row
+                if current_entry < contest.num_entries:
+                    draw_place(strip, current_entry)
+
+        with profiling.stage('downsample'):
+            if layout.factor == 1:
+                resized = canvas.crop((0, top - canvas_top, image_width, bottom - canvas_top))
+            elif layout.factor is not None:
+                factor = layout.factor
+                resized = canvas.resize((output_width, canvas.height // factor), Image.ANTIALIAS)
+                resized = resized.crop((0, output_top - canvas_top // factor, output_width, output_bottom - canvas_top // factor))
+            else:
+                # Resize just the part of the strip that lands between its cuts, with the same ratio as the whole frame
+                ratio = float(image_height) / output_height
+                resized = canvas.resize((output_width, output_bottom - output_top), Image.ANTIALIAS,
+                                        box=(0, output_top * ratio - canvas_top, image_width, output_bottom * ratio - canvas_top))
+        yield resized
+
+
+# The strips of a scoreboard, along with the size and mode of the whole resized frame
+def scoreboard_strips(contest, sorted_data, current_voter_num, colors, image_width=None, quality=None, strip_rows=8):
+    flags = countries.get_registry()
+    layout = get_layout(contest, quality)
+    header = voter_header(contest, current_voter_num)
+    image_size = (max(layout.image_size(header)[0], image_width or 0), layout.image_height)
+
+    def draw_place(strip, current_entry):
+        draw_entry(strip, strip, layout, colors, flags, current_entry, sorted_data[current_entry], current_voter_num, cache_sprite=False)
+    return layout.output_size(image_size), layout.mode, frame_strips(layout, colors, image_size, header, draw_place, strip_rows)
+
+
+def summary_strips(contest, sorted_data, colors, image_width=None, quality=None, strip_rows=8):
+    flags = countries.get_registry()
+    layout = get_layout(contest, quality)
+    image_size = (max(layout.image_size(voter_header(contest, contest.num_voters-1))[0], image_width or 0), layout.image_height)
+
+    def draw_place(strip, current_entry):
+        draw_summary_entry(strip, strip, layout, colors, flags, current_entry, sorted_data[current_entry], cache_sprite=False)
+    return layout.output_size(image_size), layout.mode, frame_strips(layout, colors, image_size, "Final Results", draw_place, strip_rows)
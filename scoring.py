@@ -0,0 +1,121 @@
+# numpy is imported by the functions that use it, so that loading a contest and printing its standings stays quick
+# Values stored in an entry's votes for cells that aren't points: blank (or unreadable) cells and disqualifications
+BLANK = -2**31
+DQ = -2**31 + 1
+
+# Votes are packed into 32-bit integers, leaving out the two values above
+MIN_POINTS = DQ + 1
+MAX_POINTS = 2**31 - 1
+
+
+# Raises a ValueError for points that don't fit, rather than reading them as something else
+def parse_vote(cell):
+    if cell.upper() == 'DQ':
+        return DQ
+    try:
+        points = int(cell)
+    except ValueError:
+        return BLANK
+    if not MIN_POINTS <= points <= MAX_POINTS:
+        raise ValueError("{!r} is not a number of points between {} and {}".format(cell, MIN_POINTS, MAX_POINTS))
+    return points
+
+
+# The text shown for a vote on the scoreboards, which is empty for blank cells
+def format_vote(points):
+    if points == BLANK:
+        return ''
+    if points == DQ:
+        return 'DQ'
+    return str(points)
+
+
+'''
+A single entry's standing after a given voter. It exposes the same attributes as an Entry so that
+print_leaders and the scoreboard renderers can use it in place of one.
+'''
+class Standing:
+    __slots__ = ('entry', 'display_pts', 'total_pts', 'num_voters', 'disqualified')
+
+    def __init__(self, entry, display_pts, total_pts, num_voters, disqualified):
+        self.entry = entry
+        self.display_pts = display_pts
+        self.total_pts = total_pts
+        self.num_voters = num_voters
+        self.disqualified = disqualified
+
+    @property
+    def user(self):
+        return self.entry.user
+
+    @property
+    def country(self):
+        return self.entry.country
+
+    @property
+    def artist(self):
+        return self.entry.artist
+
+    @property
+    def song(self):
+        return self.entry.song
+
+    @property
+    def voters(self):
+        return self.entry.voters
+
+
+'''
+Loads the vote grid once into a matrix of points, and computes the cumulative totals, displayed points,
+voter counts and rankings for every voter step in a single pass.
+'''
+class ScoringEngine:
+    def __init__(self, contest):
+        import numpy as np
+        self.contest = contest
+        self.points, self.valid, self.dq = parse_votes(contest)
+
+        # total_pts is the one used when sorting, display_pts is the one displayed on the scoreboards.
+        # Once an entry is disqualified its total_pts stays at -1 so that it sorts last.
+        self.display_pts = np.cumsum(self.points, axis=1)
+        self.num_voters = np.cumsum(self.valid, axis=1)
+        self.disqualified = np.logical_or.accumulate(self.dq, axis=1)
+        self.total_pts = np.where(self.disqualified, -1, self.display_pts)
+
+        # Sort by total_pts then display_pts, number of voters and finally artist name.
+        # np.lexsort is stable, so remaining ties keep the order of the CSV file just like sorted() does.
+        artist_rank = rank_artists(contest)
+        self.rankings = np.lexsort((np.broadcast_to(artist_rank[:, np.newaxis], self.points.shape),
+                                    -self.num_voters, -self.display_pts, -self.total_pts), axis=0)
+
+    # Return the entries' standings after the given voter, sorted by ranking
+    def standings(self, current_voter_num):
+        order = self.rankings[:, current_voter_num].tolist()
+        display_pts = self.display_pts[:, current_voter_num].tolist()
+        total_pts = self.total_pts[:, current_voter_num].tolist()
+        num_voters = self.num_voters[:, current_voter_num].tolist()
+        disqualified = self.disqualified[:, current_voter_num].tolist()
+
+        return [Standing(self.contest.data[i], display_pts[i], total_pts[i], num_voters[i], disqualified[i])
+                for i in order]
+
+
+# Convert the entries' votes into a points matrix, with masks marking valid votes and disqualifications
+def parse_votes(contest):
+    import numpy as np
+    votes = np.full((contest.num_entries, contest.num_voters), BLANK, dtype=np.int64)
+    for i, row in enumerate(contest.data):
+        votes[i] = np.frombuffer(row.voters, dtype=np.int32, count=contest.num_voters)
+
+    dq = votes == DQ
+    valid = (votes != BLANK) & ~dq
+    points = np.where(valid, votes, 0)
+    return points, valid, dq
+
+
+# Rank the entries by their lowercased artist name, giving entries with the same artist the same rank
+def rank_artists(contest):
+    import numpy as np
+    artists = [entry.artist.lower() for entry in contest.data]
+    ranks = {artist: rank for rank, artist in enumerate(sorted(set(artists)))}
+    return np.array([ranks[artist] for artist in artists], dtype=np.int64)
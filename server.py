@@ -0,0 +1,193 @@
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import hashlib
+import io
+import json
+import os
+import threading
+import scoreboards
+import scoring
+
+
+'''
+Keeps the most recently requested frames as encoded PNGs, up to max_bytes in total.
+Once it is full, the frames that haven't been requested for the longest are dropped first.
+'''
+class FrameCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, count=True):
+        with self.lock:
+            data = self.frames.get(key)
+            if data is None:
+                self.misses += count
+                return None
+            self.frames.move_to_end(key)
+            self.hits += count
+            return data
+
+    def put(self, key, data):
+        with self.lock:
+            # A frame larger than the whole cache would only push everything else out
+            if len(data) > self.max_bytes:
+                return
+            previous = self.frames.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.frames[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                evicted_key, evicted = self.frames.popitem(last=False)
+                self.size -= len(evicted)
+
+
+'''
+Renders frames of a single contest on request. The contest is loaded once and kept along with its
+standings, layout and flags, and is only loaded again when the CSV file changes. Frames are cached by
+the contest's content hash, the voter, the colors and the quality, so any change to those renders afresh.
+Cached frames are served straight away, but as rendering reuses the previous frame, only one frame is drawn at a time.
+'''
+class RenderService:
+    def __init__(self, load_contest, file_location, options, colors, quality, cache):
+        self.load_contest = load_contest
+        self.file_location = file_location
+        self.options = options
+        self.colors = colors
+        self.quality = quality
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.render_lock = threading.Lock()
+        self.last_seen = None
+
+    # Load the contest again if the CSV file has changed since it was last loaded
+    def update(self):
+        stat = os.stat(self.file_location)
+        if (stat.st_mtime_ns, stat.st_size) != self.last_seen:
+            with open(self.file_location, 'rb') as file:
+                digest = hashlib.sha1(file.read())
+            digest.update(json.dumps(self.options, sort_keys=True).encode('utf8'))
+
+            self.contest = self.load_contest()
+            self.engine = scoring.ScoringEngine(self.contest)
+            self.content_hash = digest.hexdigest()
+            self.last_seen = (stat.st_mtime_ns, stat.st_size)
+
+    def index(self):
+        with self.lock:
+            self.update()
+            contest = self.contest
+        return {
+            'name': contest.name,
+            'voters': contest.voters,
+            'frames': ['/frame/{}'.format(current_voter_num + 1) for current_voter_num in range(contest.num_voters)],
+            'summary': '/summary',
+        }
+
+    # Returns a frame as a PNG, or None if there is no such frame. A current_voter_num of None asks for the summary.
+    def frame(self, current_voter_num, colors, quality):
+        with self.lock:
+            self.update()
+            contest, engine, content_hash = self.contest, self.engine, self.content_hash
+        if contest.num_voters == 0 or (current_voter_num is not None and not 0 <= current_voter_num < contest.num_voters):
+            return None
+
+        key = (content_hash, current_voter_num, tuple(sorted(colors.items())), quality)
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+
+        with self.render_lock:
+            # Another request may have rendered the same frame while this one was waiting
+            data = self.cache.get(key, count=False)
+            if data is not None:
+                return data
+
+            if current_voter_num is None:
+                img = scoreboards.render_summary(contest, engine.standings(contest.num_voters - 1), colors, quality=quality)
+            else:
+                img = scoreboards.render_scoreboard(contest, engine.standings(current_voter_num), current_voter_num,
+                                                    colors, quality=quality)
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG')
+        data = buffer.getvalue()
+        self.cache.put(key, data)
+        return data
+
+    '''
+    The colors and quality for a request, which can be changed from the defaults with the query parameters
+    main, accent (hex colors, with or without the #), quality and resolution. Raises a ValueError for bad values.
+    '''
+    def request_options(self, query):
+        colors = self.colors
+        if 'main' in query or 'accent' in query:
+            colors = dict(colors)
+            for name in ('main', 'accent'):
+                if name in query:
+                    value = query[name][-1].lstrip('#')
+                    if len(value) != 6:
+                        raise ValueError("{} must be a hex color".format(name))
+                    colors[name] = scoreboards.hex_to_rgb(value)
+
+        quality = self.quality
+        if 'quality' in query or 'resolution' in query:
+            mode = query.get('quality', [quality.mode])[-1]
+            resolution = int(query.get('resolution', [quality.resolution])[-1])
+            if mode not in scoreboards.QUALITY_MODES or not 1 <= resolution <= 8:
+                raise ValueError("Unknown quality or resolution")
+            quality = scoreboards.Quality(mode, resolution)
+        return colors, quality
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        service = self.server.service
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+
+        try:
+            colors, quality = service.request_options(parse_qs(url.query))
+        except ValueError as error:
+            self.send_error(400, str(error))
+            return
+
+        if not parts:
+            self.send_data(json.dumps(service.index(), ensure_ascii=False).encode('utf8'), 'application/json')
+            return
+        if parts == ['summary']:
+            data = service.frame(None, colors, quality)
+        elif len(parts) == 2 and parts[0] == 'frame' and parts[1].isdigit():
+            # Frames are numbered from 1, like the saved scoreboards
+            data = service.frame(int(parts[1]) - 1, colors, quality)
+        else:
+            data = None
+
+        if data is None:
+            self.send_error(404)
+            return
+        self.send_data(data, 'image/png')
+
+    def send_data(self, data, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(service, host='127.0.0.1', port=8000):
+    httpd = ThreadingHTTPServer((host, port), RequestHandler)
+    httpd.service = service
+    print("Serving {} on http://{}:{}/ (Press Ctrl+C to stop)".format(service.file_location, host, httpd.server_port))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped serving {} ({} cache hits, {} misses)".format(service.file_location, service.cache.hits, service.cache.misses))
+    finally:
+        httpd.server_close()
@@ -0,0 +1,20 @@
+import os
+import sys
+import pytest
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# Rendering needs the fonts and flags in Resources, which can be taken from elsewhere with MELBOURNE_RESOURCES
+RESOURCES_DIR = os.environ.get('MELBOURNE_RESOURCES', os.path.join(REPO_DIR, 'Resources'))
+
+
+# A working directory with the resources in place, as the scripts load them relative to where they are run
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    if not os.path.exists(os.path.join(RESOURCES_DIR, 'Fonts', 'Dosis-Regular.ttf')):
+        pytest.skip("the Dosis fonts are not in {}".format(RESOURCES_DIR))
+    os.symlink(RESOURCES_DIR, str(tmp_path / 'Resources'))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,93 @@
+import io
+from types import SimpleNamespace
+from PIL import Image, ImageSequence
+import pytest
+import output
+
+
+# Transparent parts of a frame show the background color, rather than whatever color is stored under them
+def test_gif_flattens_transparency(tmp_path):
+    img = Image.new('RGBA', (4, 2), (0, 0, 0, 255))
+    img.putpixel((0, 0), (183, 3, 255, 0))
+    path = str(tmp_path / 'a.gif')
+
+    gif = output.GIFOutput(path)
+    gif.open(None, {'white': (255, 255, 255)})
+    gif.write_scoreboard(None, 0, Image.new('RGBA', (4, 2), (0, 0, 0, 255)))
+    gif.write_summary(None, img)
+    gif.close()
+
+    frames = [frame.convert('RGB') for frame in ImageSequence.Iterator(Image.open(path))]
+    assert len(frames) == 2
+    assert frames[-1].getpixel((0, 0)) == (255, 255, 255)
+    assert frames[-1].getpixel((1, 0)) == (0, 0, 0)
+
+
+# A contest without voters has no frames, and shouldn't leave behind an animation without any
+def test_apng_without_frames(tmp_path):
+    path = tmp_path / 'a.png'
+    apng = output.APNGOutput(str(path))
+    apng.open(SimpleNamespace(num_voters=0), {})
+    apng.close()
+    assert not path.exists()
+
+
+def test_atomic_path(tmp_path):
+    path = tmp_path / 'frame.raw'
+    with output.atomic_path(str(path), mtime_ns=10**18) as temp:
+        with open(temp, 'wb') as file:
+            file.write(b'data')
+        assert not path.exists()
+    assert path.read_bytes() == b'data'
+    assert path.stat().st_mtime_ns == 10**18
+
+    # A failed write leaves the previous file as it was, without its temporary file
+    with pytest.raises(RuntimeError):
+        with output.atomic_path(str(path)) as temp:
+            with open(temp, 'wb') as file:
+                file.write(b'partial')
+            raise RuntimeError
+    assert path.read_bytes() == b'data'
+    assert [child.name for child in tmp_path.iterdir()] == ['frame.raw']
+
+
+def gradient(mode, size, seed):
+    img = Image.new(mode, size)
+    img.putdata([tuple((x * 7 + y * 13 + seed * 31 + channel * 50) % 256 for channel in range(len(mode)))
+                 for y in range(size[1]) for x in range(size[0])])
+    return img
+
+
+# Images written a few rows at a time read back exactly as they were
+@pytest.mark.parametrize('mode', ['RGB', 'RGBA'])
+def test_png_stream_writer(mode):
+    pytest.importorskip('numpy')
+    img = gradient(mode, (23, 17), 0)
+    buffer = io.BytesIO()
+    writer = output.PNGStreamWriter(buffer, img.size, mode, compress_level=1)
+    for top in range(0, img.height, 5):
+        writer.write(img.crop((0, top, img.width, min(img.height, top + 5))))
+    writer.close()
+
+    buffer.seek(0)
+    decoded = Image.open(buffer)
+    assert (decoded.mode, decoded.size) == (mode, img.size)
+    assert decoded.tobytes() == img.tobytes()
+
+
+def test_apng_output(tmp_path):
+    path = str(tmp_path / 'a.png')
+    frames = [gradient('RGBA', (12, 9), seed) for seed in range(3)]
+    apng = output.APNGOutput(path, frame_duration=400, summary_duration=2000)
+    apng.open(SimpleNamespace(num_voters=2), {})
+    apng.write_scoreboard(None, 0, frames[0])
+    apng.write_scoreboard(None, 1, frames[1])
+    apng.write_summary(None, frames[2])
+    apng.close()
+
+    decoded = Image.open(path)
+    assert decoded.n_frames == 3
+    for frame_num, (frame, duration) in enumerate(zip(frames, [400, 400, 2000])):
+        decoded.seek(frame_num)
+        assert decoded.info['duration'] == duration
+        assert decoded.convert('RGBA').tobytes() == frame.tobytes()
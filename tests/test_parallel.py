@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+import benchmark
+import melbourne
+from conftest import REPO_DIR
+
+
+# Every frame rendered by the worker processes has to be on disk once melbourne.py exits
+def test_jobs_write_every_frame(work_dir):
+    benchmark.generate_contest('contest.csv', 12, 10, seed=1)
+    subprocess.run([sys.executable, os.path.join(REPO_DIR, 'melbourne.py'), 'contest.csv', 'Test Contest', '-j', '4'],
+                   check=True, stdout=subprocess.DEVNULL)
+
+    frames = sorted(os.listdir('Output'))
+    assert [name for name in frames if name.endswith('.tmp')] == []
+    assert len(frames) == 11
+
+
+# Results come back in order, without more than window tasks handed out ahead of the ones taken
+def test_bounded_imap():
+    from multiprocessing.dummy import Pool
+    handed_out = []
+
+    def tasks():
+        for task in range(20):
+            handed_out.append(task)
+            yield task
+
+    with Pool(4) as pool:
+        for result in melbourne.bounded_imap(pool, abs, tasks(), 3):
+            assert len(handed_out) <= result + 4
+            assert result == handed_out[result]
@@ -0,0 +1,76 @@
+import argparse
+import pytest
+import benchmark
+import melbourne
+import scoreboards
+import scoring
+
+pytest.importorskip('numpy')
+
+
+def load_contest(columns):
+    benchmark.generate_contest('contest.csv', 11, 6, dq_rate=0.2, seed=2)
+    args = argparse.Namespace(contest_name='Test Contest', flags=True, countries=False, columns=columns)
+    return melbourne.create_contest(args, melbourne.load_data('contest.csv'))
+
+
+# Joins the strips of a frame back into a single image
+def join_strips(size, mode, strips):
+    from PIL import Image
+    img = Image.new(mode, size)
+    top = 0
+    for strip in strips:
+        img.paste(strip, (0, top))
+        top += strip.height
+    assert top == size[1]
+    return img
+
+
+def assert_same_pixels(img, expected):
+    assert (img.mode, img.size) == (expected.mode, expected.size)
+    assert img.tobytes() == expected.tobytes()
+
+
+'''
+Frames drawn from the previous frame, and frames drawn in strips, have to come out exactly the same as a frame
+drawn from scratch. This goes for qualities that resize by a whole number factor, by another ratio, or not at all.
+'''
+@pytest.mark.parametrize('mode, resolution, columns', [('high', 2, 2), ('standard', 2, 3), ('draft', 1, 1)])
+@pytest.mark.parametrize('fixed_width', [False, True])
+def test_incremental_and_strips_match_fresh_render(work_dir, mode, resolution, columns, fixed_width):
+    contest = load_contest(columns)
+    engine = scoring.ScoringEngine(contest)
+    colors = scoreboards.load_colors()
+    quality = scoreboards.Quality(mode, resolution)
+    image_width = scoreboards.max_image_width(contest, quality) if fixed_width else None
+
+    scoreboards._previous_frame = None
+    for current_voter_num in range(contest.num_voters):
+        standings = engine.standings(current_voter_num)
+        incremental = scoreboards.render_scoreboard(contest, standings, current_voter_num, colors, image_width, quality)
+        strips = join_strips(*scoreboards.scoreboard_strips(contest, standings, current_voter_num, colors, image_width, quality, 1))
+
+        previous_frame, scoreboards._previous_frame = scoreboards._previous_frame, None
+        fresh = scoreboards.render_scoreboard(contest, standings, current_voter_num, colors, image_width, quality)
+        scoreboards._previous_frame = previous_frame
+
+        assert_same_pixels(incremental, fresh)
+        assert_same_pixels(strips, fresh)
+
+    standings = engine.standings(contest.num_voters - 1)
+    summary = scoreboards.render_summary(contest, standings, colors, image_width, quality)
+    strips = join_strips(*scoreboards.summary_strips(contest, standings, colors, image_width, quality, 1))
+    assert_same_pixels(strips, summary)
+
+
+# Row sprites drawn for other main and accent colors are reused, which mustn't change what a frame looks like
+def test_row_sprites_match_new_layout(work_dir):
+    contest = load_contest(2)
+    engine = scoring.ScoringEngine(contest)
+    standings = engine.standings(contest.num_voters - 1)
+    for main_color, accent_color in [('#2f292b', '#009688'), ('#000000', '#e91e63'), ('#2f292b', '#ffeb3b')]:
+        colors = scoreboards.load_colors(main_color=main_color, accent_color=accent_color)
+        img = scoreboards.render_summary(contest, standings, colors)
+
+        scoreboards._layouts.clear()
+        assert_same_pixels(img, scoreboards.render_summary(contest, standings, colors))
@@ -0,0 +1,68 @@
+from array import array
+import random
+import pytest
+import melbourne
+import scoring
+
+
+def test_parse_vote():
+    assert scoring.parse_vote('12') == 12
+    assert scoring.parse_vote('dq') == scoring.DQ
+    assert scoring.parse_vote('') == scoring.BLANK
+    assert scoring.parse_vote('x') == scoring.BLANK
+    assert scoring.parse_vote(str(scoring.MIN_POINTS)) == scoring.MIN_POINTS
+    assert scoring.parse_vote(str(scoring.MAX_POINTS)) == scoring.MAX_POINTS
+
+
+# Points that can't be stored, or that would be read back as a blank or disqualified cell, are rejected
+@pytest.mark.parametrize('cell', ['3000000000', '2147483648', '-2147483648', '-2147483647'])
+def test_parse_vote_out_of_range(cell):
+    with pytest.raises(ValueError, match=cell):
+        scoring.parse_vote(cell)
+
+
+B, D = scoring.BLANK, scoring.DQ
+
+
+def make_contest(grid, artists=None):
+    entries = [melbourne.Entry('user{}'.format(i), 'Sweden', (artists or {}).get(i, 'Artist {}'.format(i)), 'Song', array('i', votes))
+               for i, votes in enumerate(grid)]
+    return melbourne.Contest('Test', entries, ['Voter {}'.format(v) for v in range(len(grid[0]))], False, False)
+
+
+# The engine's standings have to match those from applying each voter in turn with process_voter
+def check_standings(grid, artists=None):
+    pytest.importorskip('numpy')
+    engine = scoring.ScoringEngine(make_contest(grid, artists))
+    contest = make_contest(grid, artists)
+    for current_voter_num in range(contest.num_voters):
+        expected = melbourne.process_voter(contest, current_voter_num)
+        standings = engine.standings(current_voter_num)
+        assert [(entry.user, entry.total_pts, entry.display_pts, entry.num_voters, entry.disqualified) for entry in expected] == \
+               [(standing.user, standing.total_pts, standing.display_pts, standing.num_voters, standing.disqualified)
+                for standing in standings]
+
+
+def test_standings_disqualified():
+    # Entry 1 keeps being shown with the points it gets after being disqualified, but stays last
+    check_standings([[12, 10, 8], [10, D, 12], [8, 12, B], [B, 8, 10]])
+
+
+def test_standings_blank_and_zero():
+    # A 0 counts as a vote while a blank cell doesn't, which breaks the tie between entries 0 and 1
+    check_standings([[0, 5, B], [B, 5, B], [5, 0, 0], [B, B, B]])
+
+
+def test_standings_ties():
+    # Ties on points and voters go to the artist's name regardless of case, and then to the order in the file
+    check_standings([[6, 6], [6, 6], [12, B], [12, B], [6, 6]], {0: 'beta', 1: 'Alpha', 2: 'Gamma', 3: 'gamma', 4: 'ALPHA'})
+
+
+def test_standings_random():
+    rng = random.Random(0)
+    for _ in range(50):
+        num_entries, num_voters = rng.randint(1, 12), rng.randint(1, 8)
+        cells = [B, B, D, 0, 1, 2, 12, -3]
+        grid = [[rng.choice(cells) for _ in range(num_voters)] for _ in range(num_entries)]
+        artists = {i: rng.choice(['a', 'A', 'b', 'c']) for i in range(num_entries)}
+        check_standings(grid, artists)
@@ -0,0 +1,28 @@
+import server
+
+
+# Frames that haven't been asked for the longest are dropped once the cache is over its size
+def test_frame_cache_eviction():
+    cache = server.FrameCache(10)
+    cache.put('a', b'aaaa')
+    cache.put('b', b'bbbb')
+    assert cache.get('a') == b'aaaa'
+    cache.put('c', b'cccc')
+    assert cache.get('b') is None
+    assert cache.get('a') == b'aaaa'
+    assert cache.get('c') == b'cccc'
+    assert cache.size == 8
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_frame_cache_replace_and_oversized():
+    cache = server.FrameCache(10)
+    cache.put('a', b'aaaa')
+    cache.put('a', b'aaaaaa')
+    assert cache.size == 6
+
+    # A frame larger than the whole cache isn't kept, and doesn't push the others out
+    cache.put('b', b'b' * 11)
+    assert cache.get('b', count=False) is None
+    assert cache.get('a', count=False) == b'aaaaaa'
+    assert (cache.hits, cache.misses) == (0, 0)